@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+import base64
+import hashlib
+import os
+
+
+class AttachmentStore:
+    """Content-addressed image store referenced from Memory by id.
+
+    Images are written once to directory (if set) and kept as ready-to-send
+    data URLs in an LRU cache bounded by cache_bytes. Without a directory,
+    images evicted from the cache are gone and show up as placeholders.
+    """
+
+    def __init__(self, directory: Optional[str] = None, cache_bytes: int = 32 * 1024 * 1024):
+        self.directory = Path(directory).expanduser() if directory else None
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_size = 0
+
+    @classmethod
+    def from_settings(cls, memory_settings: Dict) -> "AttachmentStore":
+        return cls(
+            memory_settings.get("attachments_dir"),
+            cache_bytes=memory_settings.get("attachment_cache_mb", 32) * 1024 * 1024
+        )
+
+    def put(self, data: bytes, content_type: str) -> Dict[str, str]:
+        """Store image bytes and return the reference kept in Memory"""
+        image_id = hashlib.sha256(data).hexdigest()
+        if self.directory:
+            path = self._path(image_id)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+        self._remember(image_id, self._encode(data, content_type))
+        return {"id": image_id, "content_type": content_type}
+
+    def data_url(self, ref: Dict[str, str]) -> Optional[str]:
+        image_id = ref["id"]
+        if image_id in self._cache:
+            self._cache.move_to_end(image_id)
+            return self._cache[image_id]
+        if self.directory and self._path(image_id).exists():
+            url = self._encode(self._path(image_id).read_bytes(), ref.get("content_type", "image/png"))
+            self._remember(image_id, url)
+            return url
+        return None
+
+    def _path(self, image_id: str) -> Path:
+        return self.directory / image_id[:2] / image_id
+
+    @staticmethod
+    def _encode(data: bytes, content_type: str) -> str:
+        return f"data:{content_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+    def _remember(self, image_id: str, url: str):
+        if image_id in self._cache:
+            self._cache.move_to_end(image_id)
+            return
+        self._cache[image_id] = url
+        self._cache_size += len(url)
+        while self._cache_size > self.cache_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_size -= len(evicted)
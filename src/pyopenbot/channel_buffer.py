@@ -0,0 +1,68 @@
+from collections import deque
+from typing import Any, Deque, List, Tuple
+import asyncio
+
+
+class ChannelBuffer:
+    """FIFO of a channel's queued messages that can be peeked without consuming.
+
+    Each entry keeps the form it was given on arrival (e.g. the formatted
+    PENDING line), so peeking never re-formats and never reorders.
+    Producers and the consumer share one event loop, and put and get do
+    not await, so entries come out in the order they were put.
+    """
+
+    def __init__(self):
+        self._entries: Deque[Tuple[Any, Any]] = deque()
+        self._not_empty = asyncio.Event()
+        self._grew = asyncio.Event()
+        self._done = asyncio.Event()
+        self._done.set()
+        self._unfinished = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def empty(self) -> bool:
+        return not self._entries
+
+    def put(self, item: Any, formatted: Any = None):
+        self._entries.append((item, formatted))
+        self._unfinished += 1
+        self._done.clear()
+        self._not_empty.set()
+        self._grew.set()
+
+    def get_nowait(self) -> Any:
+        if not self._entries:
+            raise asyncio.QueueEmpty
+        item, _ = self._entries.popleft()
+        if not self._entries:
+            self._not_empty.clear()
+        return item
+
+    async def get(self) -> Any:
+        while not self._entries:
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    async def wait_for_size(self, size: int):
+        """Wait until at least size entries are waiting"""
+        while len(self._entries) < size:
+            self._grew.clear()
+            await self._grew.wait()
+
+    def peek(self) -> List[Any]:
+        """Formatted forms of the waiting entries, oldest first"""
+        return [formatted for _, formatted in self._entries]
+
+    def task_done(self):
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._done.set()
+
+    async def join(self):
+        """Wait until every entry put so far has been marked done"""
+        await self._done.wait()
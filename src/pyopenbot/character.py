@@ -1,8 +1,36 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
+from pyopenbot.memory import MEMORY_TYPES
 import yaml
 
+
+# libyaml's loader is several times faster, where PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CONFIG_SUFFIXES = (".yaml", ".yml")
+PLATFORMS = ["terminal", "discord"]
+REQUIRED_SETTINGS = ["temperature", "top_p", "max_tokens", "context_window"]
+
+def find_character_configs(paths: List[Path]) -> List[Path]:
+    """Expand directories to the YAML files directly inside them, in name order"""
+    configs = []
+    for path in paths:
+        if path.is_dir():
+            configs.extend(sorted(p for p in path.iterdir() if p.suffix in CONFIG_SUFFIXES))
+        else:
+            configs.append(path)
+    return configs
+
+
+@dataclass
+class ConfigCheck:
+    """One line of a config validation: what was checked, whether it passed, and details"""
+    name: str
+    ok: bool
+    detail: str
+
+
 @dataclass
 class Character:
     character_name: str
@@ -17,8 +45,11 @@ class Character:
     
     memory_type: str
     
+    llm_models: List[Dict[str, Any]] = field(default_factory=list)  # fallback chain, primary first
     discord_token: Optional[str] = None
-    discord_channel_id: Optional[str] = None  # Channel ID to respond in
+    discord_channel_id: Optional[Union[str, List[str]]] = None  # Channel ID(s) to respond in, "*" for all
+    discord_settings: Dict[str, Any] = field(default_factory=dict)  # Optional tuning knobs
+    memory_settings: Dict[str, Any] = field(default_factory=dict)  # e.g. max_messages
     
     _api_key_source: Optional[str] = None  # 'file' or 'direct'
     _discord_token_source: Optional[str] = None  # 'file' or 'direct'
@@ -29,7 +60,9 @@ class Character:
             raise FileNotFoundError(f"Character config file {config_path} does not exist")
 
         with open(config_path, "r") as file:
-            config = yaml.safe_load(file)
+            config = yaml.load(file, Loader=YAML_LOADER) or {}
+        if not isinstance(config, dict):
+            raise ValueError(f"{config_path} must hold a YAML mapping")
 
         llm_config = config.get("llm", {})
         memory_config = config.get("memory", {})
@@ -48,9 +81,15 @@ class Character:
                     api_key = f.read().strip()
                 api_key_source = f"file:{llm_config['api_key_file']}"
         
+        llm_models = [
+            entry if isinstance(entry, dict) else {"model": entry}
+            for entry in llm_config.get("models", [])
+        ]
+        
         discord_token = None
         discord_token_source = None
         discord_channel_id = None
+        discord_settings = {}
         
         if config.get("platform") == "discord":
             if "token" in discord_config:
@@ -64,23 +103,84 @@ class Character:
                     discord_token_source = f"file:{discord_config['token_file']}"
             
             discord_channel_id = discord_config.get("channel_id")
+            discord_settings = {
+                key: value for key, value in discord_config.items()
+                if key not in ("token", "token_file", "channel_id")
+            }
         
         instance = cls(
             character_name=config.get("character_name", ""),
             character_card=config.get("character_card", ""),
             platform=config.get("platform", ""),
             llm_provider=llm_config.get("provider", ""),
-            llm_model=llm_config.get("model", ""),
+            llm_model=llm_config.get("model") or (llm_models[0]["model"] if llm_models else ""),
             api_key=api_key or "",
             settings=llm_config.get("settings", {}),
             memory_type=memory_config.get("type", ""),
+            llm_models=llm_models,
             discord_token=discord_token,
-            discord_channel_id=discord_channel_id
+            discord_channel_id=discord_channel_id,
+            discord_settings=discord_settings,
+            memory_settings={
+                key: value for key, value in memory_config.items() if key != "type"
+            }
         )
         instance._api_key_source = api_key_source
         instance._discord_token_source = discord_token_source
         return instance
 
+    def validate(self) -> List[ConfigCheck]:
+        """Checks shown by `pyopenbot check`; run refuses a config where any of them fails"""
+        checks = [
+            ConfigCheck("Character name", bool(self.character_name), self.character_name or "Missing"),
+            ConfigCheck(
+                "Character card", bool(self.character_card),
+                f"{len(self.character_card)} chars" if self.character_card else "Missing system prompt"
+            ),
+            ConfigCheck(
+                "Platform", self.platform in PLATFORMS,
+                self.platform if self.platform in PLATFORMS else f"Invalid: {self.platform}"
+            ),
+            ConfigCheck("Provider", bool(self.llm_provider), self.llm_provider or "Missing"),
+            ConfigCheck("Model", bool(self.llm_model), self.llm_model or "Missing"),
+            ConfigCheck("API key", bool(self.api_key), "Configured" if self.api_key else "Not configured"),
+        ]
+        
+        for setting in REQUIRED_SETTINGS:
+            name = setting.replace("_", " ").title()
+            value = self.settings.get(setting)
+            if setting not in self.settings:
+                checks.append(ConfigCheck(name, False, "Missing"))
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                checks.append(ConfigCheck(name, False, f"Not a number: {value!r}"))
+            else:
+                checks.append(ConfigCheck(name, True, str(value)))
+        
+        bad_models = [entry for entry in self.llm_models if not isinstance(entry.get("model"), str)]
+        if bad_models:
+            checks.append(ConfigCheck("Models", False, f"Entries without a model name: {bad_models}"))
+        elif self.llm_models:
+            checks.append(ConfigCheck("Models", True, " -> ".join(entry["model"] for entry in self.llm_models)))
+        
+        if self.memory_type in MEMORY_TYPES:
+            checks.append(ConfigCheck("Memory", True, self.memory_type))
+        else:
+            checks.append(ConfigCheck(
+                "Memory", False, f"Invalid: {self.memory_type}" if self.memory_type else "Missing"
+            ))
+        
+        if self.platform == "discord":
+            if self.discord_token:
+                source = "Direct" if self._discord_token_source == "direct" else "File"
+                checks.append(ConfigCheck("Discord Token", True, f"Configured ({source})"))
+            else:
+                checks.append(ConfigCheck("Discord Token", False, "Not configured"))
+        return checks
+    
+    def errors(self) -> List[str]:
+        """The failed checks of validate(), as messages"""
+        return [f"{check.name}: {check.detail}" for check in self.validate() if not check.ok]
+    
     def save_to_yaml(self, config_path: Path) -> None:
         config = {
             "character_name": self.character_name,
@@ -92,10 +192,14 @@ class Character:
                 "settings": self.settings
             },
             "memory": {
-                "type": self.memory_type
+                "type": self.memory_type,
+                **self.memory_settings
             }
         }
         
+        if self.llm_models:
+            config["llm"]["models"] = self.llm_models
+        
         if self._api_key_source and self._api_key_source.startswith("file:"):
             file_path = self._api_key_source[5:]  # Remove "file:" prefix
             config["llm"]["api_key_file"] = file_path
@@ -112,6 +216,7 @@ class Character:
             
             if self.discord_channel_id:
                 config["discord"]["channel_id"] = self.discord_channel_id
+            config["discord"].update(self.discord_settings)
 
         with open(config_path, "w") as file:
             yaml.dump(config, file, default_flow_style=False, sort_keys=False)
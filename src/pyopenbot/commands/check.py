@@ -1,10 +1,22 @@
 from pyopenbot.platforms.cli_platform import CLIPlatform
 from pyopenbot.commands.base_command import BaseCommand
-from pyopenbot.character import Character
+from pyopenbot.character import Character, find_character_configs
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional
 from rich.console import Console
+from rich.markup import escape
 from rich.panel import Panel
 from rich.table import Table
+import typer
+
+
+def _check_one(config: Path) -> List[str]:
+    """Problems with one config, empty when it is ready to run"""
+    try:
+        return Character.from_yaml(config).errors()
+    except Exception as e:
+        return [f"Valid config: {e}"]
 
 
 class Check(BaseCommand):
@@ -12,14 +24,22 @@ class Check(BaseCommand):
         self.cli_platform = CLIPlatform()
         self.console = Console()
 
-    def run(self, character_config: Path) -> None:
+    def run(self, character_config: Optional[Path] = typer.Argument(None),
+            all_configs: Optional[Path] = typer.Option(
+                None, "--all", help="Check every config in a directory"
+            )) -> None:
+        if all_configs is not None:
+            self.check_all(all_configs)
+            return
+        if character_config is None:
+            self.console.print("[red]Error: Give a character config or --all <directory>[/red]")
+            raise typer.Exit(1)
+
         table = Table(title=f"Configuration Check: {character_config.name}")
         table.add_column("Check", style="cyan")
         table.add_column("Status", style="green")
         table.add_column("Details")
-        
-        has_errors = False
-        
+
         if not character_config.exists():
             table.add_row(
                 "File exists",
@@ -28,84 +48,66 @@ class Check(BaseCommand):
             )
             self.console.print(table)
             return
-        
+
         table.add_row("File exists", "✅", str(character_config))
-        
+
         try:
             character = Character.from_yaml(character_config)
-            table.add_row("Valid YAML", "✅", "Successfully parsed")
-            
-            if character.character_name:
-                table.add_row("Character name", "✅", character.character_name)
-            else:
-                table.add_row("Character name", "❌", "[red]Missing[/red]")
-                has_errors = True
-            
-            if character.character_card:
-                table.add_row("Character card", "✅", f"{len(character.character_card)} chars")
-            else:
-                table.add_row("Character card", "❌", "[red]Missing system prompt[/red]")
-                has_errors = True
-            
-            if character.platform in ["terminal", "discord"]:
-                table.add_row("Platform", "✅", character.platform)
-            else:
-                table.add_row("Platform", "❌", f"[red]Invalid: {character.platform}[/red]")
-                has_errors = True
-            
-            if character.llm_provider:
-                table.add_row("Provider", "✅", character.llm_provider)
-            else:
-                table.add_row("Provider", "❌", "[red]Missing[/red]")
-                has_errors = True
-            
-            if character.llm_model:
-                table.add_row("Model", "✅", character.llm_model)
-            else:
-                table.add_row("Model", "❌", "[red]Missing[/red]")
-                has_errors = True
-            
-            if character.api_key:
-                table.add_row("API key", "✅", "Configured")
-            else:
-                table.add_row("API key", "❌", "[red]Not configured[/red]")
-                has_errors = True
-            
-            required_settings = ["temperature", "top_p", "max_tokens", "context_window"]
-            for setting in required_settings:
-                if setting in character.settings:
-                    table.add_row(setting.replace("_", " ").title(), "✅", str(character.settings[setting]))
-                else:
-                    table.add_row(setting.replace("_", " ").title(), "❌", "[red]Missing[/red]")
-                    has_errors = True
-            
-            if character.memory_type:
-                table.add_row("Memory", "✅", character.memory_type)
-            else:
-                table.add_row("Memory", "❌", "[red]Missing[/red]")
-                has_errors = True
-            
-            if character.platform == "discord":
-                if character.discord_token:
-                    source = "Direct" if character._discord_token_source == "direct" else "File"
-                    table.add_row("Discord Token", "✅", f"Configured ({source})")
-                else:
-                    table.add_row("Discord Token", "❌", "[red]Not configured[/red]")
-                    has_errors = True
-            
-            self.console.print(table)
-            
-            if has_errors:
-                self.console.print(Panel(
-                    "[bold red]❌ Configuration has errors[/bold red]",
-                    title="Status"
-                ))
-            else:
-                self.console.print(Panel(
-                    "[bold green]🎉 Ready to run![/bold green]",
-                    title="Status"
-                ))
-            
         except Exception as e:
-            table.add_row("Valid config", "❌", f"[red]{str(e)}[/red]")
+            table.add_row("Valid config", "❌", f"[red]{escape(str(e))}[/red]")
             self.console.print(table)
+            return
+
+        table.add_row("Valid YAML", "✅", "Successfully parsed")
+        checks = character.validate()
+        for check in checks:
+            if check.ok:
+                table.add_row(check.name, "✅", escape(check.detail))
+            else:
+                table.add_row(check.name, "❌", f"[red]{escape(check.detail)}[/red]")
+
+        self.console.print(table)
+
+        if all(check.ok for check in checks):
+            self.console.print(Panel(
+                "[bold green]🎉 Ready to run![/bold green]",
+                title="Status"
+            ))
+        else:
+            self.console.print(Panel(
+                "[bold red]❌ Configuration has errors[/bold red]",
+                title="Status"
+            ))
+
+    def check_all(self, directory: Path) -> None:
+        """Validate every config in a directory in parallel, one row each"""
+        if not directory.is_dir():
+            self.console.print(f"[red]Error: {directory} is not a directory[/red]")
+            raise typer.Exit(1)
+        configs = find_character_configs([directory])
+        # Parsing is mostly libyaml and file reads, so threads keep up without process start-up cost
+        with ThreadPoolExecutor() as pool:
+            results = list(pool.map(_check_one, configs))
+
+        table = Table(title=f"Configuration Check: {directory}")
+        table.add_column("Config", style="cyan")
+        table.add_column("Status", style="green")
+        table.add_column("Problems")
+        for config, errors in zip(configs, results):
+            if errors:
+                table.add_row(config.name, "❌", "[red]" + escape("\n".join(errors)) + "[/red]")
+            else:
+                table.add_row(config.name, "✅", "")
+        self.console.print(table)
+
+        failed = sum(1 for errors in results if errors)
+        if failed:
+            self.console.print(Panel(
+                f"[bold red]❌ {failed} of {len(configs)} configurations have errors[/bold red]",
+                title="Status"
+            ))
+            raise typer.Exit(1)
+        self.console.print(Panel(
+            f"[bold green]🎉 All {len(configs)} configurations are ready to run![/bold green]",
+            title="Status"
+        ))
@@ -1,6 +1,7 @@
 from pyopenbot.platforms.cli_platform import CLIPlatform
 from pyopenbot.commands.base_command import BaseCommand
 from pyopenbot.character import Character
+from pyopenbot.memory import MEMORY_TYPES
 from pathlib import Path
 from rich.console import Console
 from rich.panel import Panel
@@ -128,7 +129,9 @@ class Init(BaseCommand):
                 discord_token = Prompt.ask("Enter Discord Bot Token", password=True)
                 discord_config = {"token": discord_token}
             
-            channel_id = Prompt.ask("Discord Channel ID to respond in")
+            channel_id = Prompt.ask("Discord Channel ID(s) to respond in (comma separated, * for all)")
+            if channel_id and "," in channel_id:
+                channel_id = [value.strip() for value in channel_id.split(",") if value.strip()]
             discord_config["channel_id"] = channel_id
         
         self.console.print("\n[bold]🧠 Memory Configuration[/bold]")
@@ -136,10 +139,14 @@ class Init(BaseCommand):
         
         memory_type = Prompt.ask(
             "Memory type",
-            choices=["unlimited"],
+            choices=MEMORY_TYPES,
             default="unlimited"
         )
         
+        memory_settings = {}
+        if memory_type == "sliding_window":
+            memory_settings["max_messages"] = IntPrompt.ask("Messages to keep", default=50)
+        
         self.console.print("\n[bold]💾 Save Configuration[/bold]")
         self.console.print("─" * 40)
         
@@ -161,7 +168,8 @@ class Init(BaseCommand):
                 "settings": settings
             },
             "memory": {
-                "type": memory_type
+                "type": memory_type,
+                **memory_settings
             }
         }
         
@@ -193,7 +201,8 @@ class Init(BaseCommand):
             settings=settings,
             memory_type=memory_type,
             discord_token=discord_token,
-            discord_channel_id=discord_channel_id
+            discord_channel_id=discord_channel_id,
+            memory_settings=memory_settings
         )
         
         if 'api_key_file' in api_key_config:
@@ -1,14 +1,12 @@
 from pyopenbot.platforms.cli_platform import CLIPlatform
 from pyopenbot.commands.base_command import BaseCommand
-from pyopenbot.character import Character
-from pyopenbot.llm_service import LLMService
-from pyopenbot.memory import Memory
+from pyopenbot.character import Character, find_character_configs
 from pathlib import Path
+from typing import List, Optional
 from rich.console import Console
+from rich.markup import escape
 from rich.panel import Panel
-from rich.prompt import Prompt
-from rich.table import Table
-import sys
+import typer
 
 
 class Run(BaseCommand):
@@ -16,32 +14,45 @@ class Run(BaseCommand):
         self.cli_platform = CLIPlatform()
         self.console = Console()
 
-    def run(self, character_config: Path) -> None:
-        try:
-            character = Character.from_yaml(character_config)
-        except FileNotFoundError as e:
-            self.console.print(f"[red]Error: {e}[/red]")
+    def run(self, character_config: List[Path],
+            max_concurrency: int = typer.Option(16, help="In-flight completions per process"),
+            workers: int = typer.Option(1, help="Worker processes to spread the characters over"),
+            ledger: Optional[Path] = typer.Option(None, help="JSON file for usage totals across workers")) -> None:
+        if workers > 1:
+            self.run_supervised(character_config, workers, max_concurrency, ledger)
+            return
+        if len(character_config) > 1 or character_config[0].is_dir():
+            self.run_many(character_config, max_concurrency)
             return
-        except Exception as e:
-            self.console.print(f"[red]Error loading config: {e}[/red]")
+        characters = self._load(character_config)
+        if characters is None:
             return
+        character = characters[0]
+        
+        # The LLM SDK is only imported once a bot is about to start
+        from pyopenbot.attachments import AttachmentStore
+        from pyopenbot.llm_service import LLMService
+        from pyopenbot.memory import Memory
         
         llm_service = LLMService(character)
-        memory = Memory(
-            type=character.memory_type,
-            max_context=character.settings.get("context_window", 8192)
-        )
         
         if character.platform == "discord":
-            if not character.discord_token:
-                self.console.print("[red]Error: Discord token not configured[/red]")
-                return
-            
             from pyopenbot.platforms.discord_platform import DiscordPlatform
             
-            discord_platform = DiscordPlatform(character, llm_service, memory)
+            # One memory per channel, sharing a single attachment store
+            attachments = AttachmentStore.from_settings(character.memory_settings)
+            discord_platform = DiscordPlatform(
+                character,
+                llm_service,
+                lambda channel: Memory.from_character(
+                    character, summarizer=llm_service.summarize, channel=channel, attachments=attachments
+                )
+            )
             
-            channel_info = f"Channel: {character.discord_channel_id}\n" if character.discord_channel_id else "Channel: All (DMs and mentions)\n"
+            channel_id = character.discord_channel_id
+            if isinstance(channel_id, list):
+                channel_id = ", ".join(str(value) for value in channel_id)
+            channel_info = f"Channel: {'All' if channel_id == '*' else channel_id}\n" if channel_id else "Channel: None configured\n"
             self.console.print(Panel(
                 f"[bold cyan]🤖 PyOpenBot Discord Mode[/bold cyan]\n"
                 f"Character: {character.character_name}\n"
@@ -57,6 +68,9 @@ class Run(BaseCommand):
             except Exception as e:
                 self.console.print(f"[red]Discord Error: {e}[/red]")
         else:
+            from pyopenbot.platforms.terminal_platform import TerminalPlatform
+            
+            memory = Memory.from_character(character, summarizer=llm_service.summarize)
             self.console.print(Panel(
                 f"[bold cyan]🤖 PyOpenBot v0.3.0 - {character.platform.title()}[/bold cyan]\n"
                 f"Character: {character.character_name}\n"
@@ -66,134 +80,77 @@ class Run(BaseCommand):
                 title="PyOpenBot Started"
             ))
             
-            self.conversation_loop(character, llm_service, memory)
-    
-    def conversation_loop(self, character, llm_service, memory):
-        while True:
-            try:
-                user_input = Prompt.ask("\n[bold cyan]You[/bold cyan]")
-                
-                if user_input.startswith("/"):
-                    if not self.handle_command(user_input, character, memory):
-                        break
-                    continue
-                
-                memory.add_message("user", user_input)
-                
-                try:
-                    self.console.print("\n[dim]Thinking...[/dim]", end="\r")
-                    response, usage = llm_service.get_response(user_input, memory.get_messages())
-                    self.console.print(" " * 20, end="\r")  # Clear "Thinking..."
-                    
-                    memory.add_message("assistant", response)
-                    if usage:
-                        memory.add_usage(usage)
-                    
-                    self.console.print(Panel(
-                        response,
-                        title=f"[bold green]{character.character_name}[/bold green]",
-                        border_style="green"
-                    ))
-                    
-                    if usage and usage.get('cost') is not None:
-                        self.console.print(f"[dim]Cost: ${usage['cost']:.6f} | Tokens: {usage.get('total_tokens', 0)}[/dim]")
-                    
-                except Exception as e:
-                    self.console.print(" " * 20, end="\r")  # Clear "Thinking..."
-                    error_msg = str(e)
-                    if "no providers" in error_msg.lower():
-                        self.console.print("[red]Error: No providers available that comply with privacy requirements[/red]")
-                    elif "api" in error_msg.lower() and "key" in error_msg.lower():
-                        self.console.print("[red]Error: Invalid API key[/red]")
-                    else:
-                        self.console.print(f"[red]Error: {error_msg}[/red]")
-                        
-            except KeyboardInterrupt:
-                self.console.print("\n[yellow]Use /quit to exit[/yellow]")
-                continue
-            except EOFError:
-                break
+            TerminalPlatform(character, llm_service, memory).run()
     
-    def handle_command(self, command: str, character, memory) -> bool:
-        cmd = command.lower().strip()
-        
-        if cmd in ["/quit", "/exit"]:
-            self.console.print("[yellow]Goodbye![/yellow]")
-            return False
-        
-        elif cmd == "/clear":
-            memory.clear()
-            self.console.print("[green]Conversation cleared[/green]")
-        
-        elif cmd == "/system":
-            self.console.print(Panel(
-                character.character_card,
-                title="[bold]System Prompt[/bold]",
-                border_style="blue"
-            ))
-        
-        elif cmd == "/stats":
-            stats = memory.get_stats()
-            table = Table(title="Session Statistics")
-            table.add_column("Metric", style="cyan")
-            table.add_column("Value", style="green")
-            
-            table.add_row("Messages", str(stats["message_count"]))
-            table.add_row("Total Cost", f"${stats['total_cost']:.6f}")
-            table.add_row("Prompt Tokens", str(stats["prompt_tokens"]))
-            table.add_row("Completion Tokens", str(stats["completion_tokens"]))
-            table.add_row("Total Tokens", str(stats["total_tokens"]))
-            table.add_row("Context Usage", stats["context_usage"])
-            table.add_row("Context %", f"{stats['context_percentage']:.1f}%")
-            
-            self.console.print(table)
+    def run_many(self, paths: List[Path], max_concurrency: int) -> None:
+        """Host several Discord characters in this one process"""
+        from pyopenbot.host import CharacterHost
         
-        elif cmd == "/history":
-            messages = memory.get_messages()
-            
-            full_messages = [
-                {"role": "system", "content": character.character_card},
-                *messages
-            ]
-            
-            self.console.print(Panel("[bold]Conversation History (sent to model)[/bold]", title="History"))
-            for msg in full_messages:
-                role_color = "cyan" if msg['role'] == "user" else "green" if msg['role'] == "assistant" else "yellow"
-                self.console.print(f"[bold {role_color}]{msg['role'].upper()}:[/bold {role_color}]")
-                self.console.print(msg['content'])
-                self.console.print()
-        
-        elif cmd == "/config":
-            table = Table(title="Bot Configuration")
-            table.add_column("Setting", style="cyan")
-            table.add_column("Value", style="green")
-            
-            table.add_row("Character Name", character.character_name)
-            table.add_row("Provider", character.llm_provider)
-            table.add_row("Model", character.llm_model)
-            table.add_row("Memory Type", character.memory_type)
-            table.add_row("Temperature", str(character.settings.get('temperature', 'N/A')))
-            table.add_row("Top-p", str(character.settings.get('top_p', 'N/A')))
-            table.add_row("Max Tokens", str(character.settings.get('max_tokens', 'N/A')))
-            table.add_row("Context Window", str(character.settings.get('context_window', 'N/A')))
-            table.add_row("Platform", character.platform)
-            
-            self.console.print(table)
+        characters = self._load(find_character_configs(paths))
+        if characters is None:
+            return
+        try:
+            host = CharacterHost(characters, max_concurrency)
+        except ValueError as e:
+            self.console.print(f"[red]Error: {e}[/red]")
+            return
         
-        elif cmd == "/help":
-            help_text = """
-[bold]Available Commands:[/bold]
-  /help    - Show this help message
-  /quit    - Exit the bot
-  /clear   - Clear conversation history
-  /system  - Show system prompt
-  /stats   - Show session statistics
-  /history - Show full conversation history sent to model
-  /config  - Show bot configuration
-            """
-            self.console.print(Panel(help_text.strip(), title="[bold]Help[/bold]"))
+        character_lines = "".join(
+            f"Character: {character.character_name} ({character.llm_model})\n"
+            for character in host.characters
+        )
+        self.console.print(Panel(
+            f"[bold cyan]🤖 PyOpenBot Discord Mode[/bold cyan]\n"
+            f"{character_lines}"
+            f"Max concurrent completions: {max_concurrency}\n"
+            f"Starting {len(host.characters)} Discord bots...",
+            title="Discord Bots Starting"
+        ))
+        host.run()
+    
+    def run_supervised(self, paths: List[Path], workers: int, max_concurrency: int,
+                       ledger: Optional[Path]) -> None:
+        """Spread Discord characters over worker processes that are restarted if they crash"""
+        from pyopenbot.supervisor import Supervisor
         
-        else:
-            self.console.print(f"[red]Unknown command: {command}[/red]")
+        configs = find_character_configs(paths)
+        characters = self._load(configs)
+        if characters is None:
+            return
+        if any(character.platform != "discord" for character in characters):
+            self.console.print("[red]Error: Worker processes need one or more discord characters[/red]")
+            return
         
-        return True
+        supervisor = Supervisor(configs, workers=workers, max_concurrency=max_concurrency, ledger_path=ledger)
+        self.console.print(Panel(
+            f"[bold cyan]🤖 PyOpenBot Discord Mode[/bold cyan]\n"
+            f"Characters: {', '.join(character.character_name for character in characters)}\n"
+            f"Worker processes: {len(supervisor.processes)}\n"
+            f"Usage ledger: {ledger or 'not saved'}",
+            title="Discord Supervisor Starting"
+        ))
+        supervisor.run()
+    
+    def _load(self, configs: List[Path]) -> Optional[List[Character]]:
+        """Load and validate character configs; prints what is wrong and returns None if any fails"""
+        if not configs:
+            self.console.print("[red]Error: No character configs found[/red]")
+            return None
+        characters = []
+        for config in configs:
+            try:
+                character = Character.from_yaml(config)
+            except FileNotFoundError as e:
+                self.console.print(f"[red]Error: {e}[/red]")
+                return None
+            except Exception as e:
+                self.console.print(f"[red]Error loading config: {e}[/red]")
+                return None
+            errors = character.errors()
+            if errors:
+                self.console.print(f"[red]Error: {config} is not valid (see pyopenbot check)[/red]")
+                for error in errors:
+                    self.console.print(f"[red]  {escape(error)}[/red]")
+                return None
+            characters.append(character)
+        return characters
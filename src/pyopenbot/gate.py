@@ -0,0 +1,77 @@
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+import re
+import time
+
+
+Classifier = Callable[[List[Dict]], Awaitable[bool]]
+
+
+class ResponseGate:
+    """Cheap check in front of the full model that decides whether to reply at all.
+
+    Messages that address the bot always pass. Keyword hits pass while
+    the bot is under max_unprompted_per_minute. Anything else goes to the
+    classifier (a small model that sees only the last few messages) if
+    one is set, or to the otherwise policy: "reply" or "skip". A
+    classifier that fails is counted and the otherwise policy decides.
+    """
+
+    def __init__(self, keywords: Optional[List[str]] = None,
+                 max_unprompted_per_minute: Optional[int] = None,
+                 classifier: Optional[Classifier] = None,
+                 classifier_messages: int = 4,
+                 otherwise: str = "reply"):
+        self.keywords = [keyword.lower() for keyword in keywords or []]
+        self.max_unprompted_per_minute = max_unprompted_per_minute
+        self.classifier = classifier
+        self.classifier_messages = classifier_messages
+        self.otherwise = otherwise
+        self.classifier_errors = 0
+        self._pattern = (
+            re.compile(r"\b(" + "|".join(re.escape(keyword) for keyword in self.keywords) + r")\b")
+            if self.keywords else None
+        )
+        self._unprompted: Deque[float] = deque()
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], classifier: Optional[Classifier] = None) -> "ResponseGate":
+        if settings.get("otherwise", "reply") not in ("reply", "skip"):
+            raise ValueError(f"gate.otherwise must be reply or skip, not {settings['otherwise']!r}")
+        return cls(
+            keywords=settings.get("keywords"),
+            max_unprompted_per_minute=settings.get("max_unprompted_per_minute"),
+            classifier=classifier if settings.get("classifier_model") else None,
+            classifier_messages=settings.get("classifier_messages", 4),
+            otherwise=settings.get("otherwise", "reply")
+        )
+
+    async def should_reply(self, text: str, addressed: bool, recent: List[Dict]) -> bool:
+        """Decide for the newest turn; recent is the history ending with it"""
+        if addressed:
+            return True
+        if self._rate_limited():
+            return False
+        if self._pattern and self._pattern.search(text.lower()):
+            return self._allow()
+        if self.classifier:
+            try:
+                wanted = await self.classifier(recent[-self.classifier_messages:])
+            except Exception:
+                # A cheap pre-filter must not be able to silence the bot
+                self.classifier_errors += 1
+            else:
+                return self._allow() if wanted else False
+        return self._allow() if self.otherwise == "reply" else False
+
+    def _rate_limited(self) -> bool:
+        if not self.max_unprompted_per_minute:
+            return False
+        now = time.monotonic()
+        while self._unprompted and now - self._unprompted[0] > 60:
+            self._unprompted.popleft()
+        return len(self._unprompted) >= self.max_unprompted_per_minute
+
+    def _allow(self) -> bool:
+        self._unprompted.append(time.monotonic())
+        return True
@@ -0,0 +1,98 @@
+from pyopenbot.attachments import AttachmentStore
+from pyopenbot.character import Character
+from pyopenbot.llm_service import LLMService
+from pyopenbot.memory import Memory
+from pyopenbot.platforms.discord_platform import DiscordPlatform
+from typing import Callable, Dict, List, Optional
+from rich.console import Console
+import asyncio
+import aiohttp
+import discord
+
+
+class CharacterHost:
+    """Runs many Discord characters in one process on one event loop.
+
+    The characters share one connection pool for image downloads and
+    usage lookups, one provider client per API key, and a global cap on
+    in-flight completions. Each keeps its own Discord connection,
+    per-channel memories and stats.
+    """
+
+    def __init__(self, characters: List[Character], max_concurrency: int = 16,
+                 usage_listener: Optional[Callable[[str, dict], None]] = None):
+        names = [character.character_name for character in characters]
+        tokens = [character.discord_token for character in characters]
+        for character in characters:
+            if character.platform != "discord":
+                raise ValueError(f"{character.character_name}: only discord characters can share a process")
+            if not character.discord_token:
+                raise ValueError(f"{character.character_name}: Discord token not configured")
+            if names.count(character.character_name) > 1:
+                raise ValueError(f"{character.character_name}: character name is used more than once")
+            if tokens.count(character.discord_token) > 1:
+                raise ValueError(f"{character.character_name}: Discord token is used by another character")
+        self.characters = characters
+        self.max_concurrency = max_concurrency
+        self.usage_listener = usage_listener  # (character name, usage) for every recorded usage
+        self.platforms: Dict[str, DiscordPlatform] = {}
+        self.console = Console()
+        self._connector: Optional[aiohttp.TCPConnector] = None
+
+    def build(self):
+        """Create the shared resources and one platform per character; needs a running loop"""
+        limiter = asyncio.Semaphore(self.max_concurrency)
+        clients = {}
+        self._connector = aiohttp.TCPConnector(limit=100)
+        for character in self.characters:
+            llm_service = LLMService(character, limiter=limiter, connector=self._connector, clients=clients)
+            attachments = AttachmentStore.from_settings(character.memory_settings)
+            self.platforms[character.character_name] = DiscordPlatform(
+                character,
+                llm_service,
+                self._memory_factory(character, llm_service, attachments, self.usage_listener),
+                connector=self._connector
+            )
+
+    @staticmethod
+    def _memory_factory(character: Character, llm_service: LLMService, attachments: AttachmentStore,
+                        usage_listener: Optional[Callable[[str, dict], None]]):
+        def create(channel: str) -> Memory:
+            memory = Memory.from_character(
+                character, summarizer=llm_service.summarize, channel=channel, attachments=attachments
+            )
+            if usage_listener:
+                memory.usage_listener = lambda usage: usage_listener(character.character_name, usage)
+            return memory
+        return create
+
+    async def start(self):
+        """Run every bot until all of them have stopped; one failing does not stop the others"""
+        if not self.platforms:
+            self.build()
+        try:
+            results = await asyncio.gather(
+                *(platform.start(platform.character.discord_token) for platform in self.platforms.values()),
+                return_exceptions=True
+            )
+            for name, result in zip(self.platforms, results):
+                if isinstance(result, Exception):
+                    self.console.print(f"[red]{name}: Discord Error: {result}[/red]")
+        finally:
+            await self.aclose()
+
+    async def shutdown(self, timeout: float = 30.0):
+        """Drain every bot's queues, then log them all out"""
+        await asyncio.gather(*(platform.shutdown(timeout) for platform in self.platforms.values()))
+
+    async def aclose(self):
+        """Close the shared pool; each platform closes its own resources when it stops"""
+        if self._connector is not None:
+            await self._connector.close()
+
+    def run(self):
+        discord.utils.setup_logging()
+        try:
+            asyncio.run(self.start())
+        except KeyboardInterrupt:
+            pass
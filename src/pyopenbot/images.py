@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Hashable, Optional, Tuple
+import asyncio
+import io
+import multiprocessing
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pillow is optional: pip install pyopenbot[images]
+    Image = None
+
+
+def preprocess_image(data: bytes, max_edge: int, image_format: str, quality: int) -> Tuple[bytes, str]:
+    """Downscale to max_edge, drop metadata and re-encode. Runs in a worker process."""
+    with Image.open(io.BytesIO(data)) as original:
+        # Apply the EXIF orientation while the tag is still there; the saved image has none
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_edge, max_edge))
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            # JPEG has no alpha channel, flatten onto white
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        output = io.BytesIO()
+        # Saving without exif/icc arguments leaves the metadata behind
+        image.save(output, format=image_format, quality=quality)
+    return output.getvalue(), f"image/{image_format.lower()}"
+
+
+class ImagePreprocessor:
+    """Shrinks images before they are sent to the model, off the event loop.
+
+    Results are cached by attachment id so /resume and retries reuse them.
+    """
+
+    def __init__(self, max_edge: int = 1568, image_format: str = "webp", quality: int = 85,
+                 workers: int = 2, cache_size: int = 256, executor: Optional[Executor] = None):
+        self.max_edge = max_edge
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.workers = workers
+        self.cache_size = cache_size
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._cache: "OrderedDict[Hashable, Tuple[bytes, str]]" = OrderedDict()
+
+    @staticmethod
+    def available() -> bool:
+        return Image is not None
+
+    def cached(self, key: Hashable) -> Optional[Tuple[bytes, str]]:
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        return result
+
+    async def process(self, key: Hashable, data: bytes, content_type: str) -> Tuple[bytes, str]:
+        cached = self.cached(key)
+        if cached is not None:
+            return cached
+        if Image is None:
+            return data, content_type
+
+        if self._executor is None:
+            # Forking a process that already runs threads (e.g. aiohttp's resolver) can deadlock
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._executor, preprocess_image, data, self.max_edge, self.image_format, self.quality
+        )
+
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def close(self):
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
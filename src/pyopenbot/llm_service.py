@@ -1,28 +1,302 @@
-from any_llm import completion
-from typing import List, Dict, Any, Optional
-import requests
+from any_llm import AnyLLM
+from pyopenbot.metrics import Metrics
+from pyopenbot.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional
+import aiohttp
 import asyncio
 import time
 
 
+OPENROUTER_API_BASE = "https://openrouter.ai/api/v1"
+
+SUMMARY_PROMPT = """You maintain the long-term memory of a chat.
+Merge the previous summary and the new messages into one updated summary.
+Keep names, facts, decisions, open questions and each person's tone.
+Write plain prose in under 300 words. Reply with the summary only."""
+
+# Providers that only cache prompts at explicit cache_control breakpoints;
+# others (OpenAI, DeepSeek, ...) cache matching prefixes automatically
+CACHE_CONTROL_PREFIXES = ("anthropic/", "google/gemini")
+
+# Calls a model must have made before its error rate affects routing
+MIN_ROUTING_SAMPLES = 4
+
+GATE_PROMPT = """You decide whether a chat participant should speak next.
+Their persona:
+{persona}
+
+Given the last messages of the chat, answer YES if they would naturally
+reply to the newest message, otherwise NO. Answer with YES or NO only."""
+
+
 class LLMService:
-    def __init__(self, character):
+    def __init__(self, character, limiter: Optional[asyncio.Semaphore] = None,
+                 connector: Optional[aiohttp.BaseConnector] = None,
+                 clients: Optional[Dict[tuple, AnyLLM]] = None):
         self.character = character
-        self.model = f"openrouter/{character.llm_model}"  # e.g., "openrouter/z-ai/glm-4.5"
+        self.model = character.llm_model  # e.g., "z-ai/glm-4.5"
+        # Fallback chain, primary first; entries may carry max_p95_ms, max_error_rate, max_cost
+        self.models: List[Dict[str, Any]] = character.llm_models or [{"model": self.model}]
+        self.api_base = character.settings.get("api_base")  # None uses the provider default
+        self._client = None
+        # A host shares provider clients, keyed by (api_key, api_base), and one connection pool
+        self._clients = clients
+        self._connector = connector
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._background_tasks = set()
+        self.usage_lookup_delay = 2.0  # OpenRouter needs a moment before stats exist
+        self.metrics = Metrics()
+        # Caps in-flight completions; pass one semaphore to share the cap between services
+        self.limiter = limiter or asyncio.Semaphore(character.settings.get("max_concurrency", 4))
+        self.retry_policy = RetryPolicy.from_settings(character.settings)
+        self.breakers: Dict[str, CircuitBreaker] = {}  # per model
+        # A demoted model gets a fresh start after this many seconds, see _route
+        self.probe_after = character.settings.get("route_probe_after", 30.0)
+        self._demoted_since: Dict[str, float] = {}
+    
+    def _get_client(self) -> AnyLLM:
+        """Create the provider client once so its connection pool is reused"""
+        if self._client is None:
+            key = (self.character.api_key, self.api_base)
+            if self._clients is not None and key in self._clients:
+                self._client = self._clients[key]
+                return self._client
+            self._client = AnyLLM.create(
+                "openrouter",
+                api_key=self.character.api_key,
+                api_base=self.api_base,
+                max_retries=0,  # retries are done by _complete, see RetryPolicy
+                unified_exceptions=True
+            )
+            if self._clients is not None:
+                self._clients[key] = self._client
+        return self._client
+    
+    def _breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker.from_settings(self.character.settings)
+        return self.breakers[model]
+    
+    async def _complete(self, attempts: Optional[int] = None, **completion_kwargs):
+        """acompletion with a per-call timeout, retries with backoff and the model's circuit breaker"""
+        policy = self.retry_policy
+        attempts = attempts or policy.attempts
+        model = completion_kwargs["model"]
+        breaker = self._breaker(model)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                self.metrics.incr("llm_circuit_rejected")
+                raise
+            try:
+                async with asyncio.timeout(policy.timeout):
+                    response = await self._get_client().acompletion(**completion_kwargs)
+            except asyncio.CancelledError:
+                breaker.abandon()
+                raise
+            except Exception as error:
+                if not is_retryable(error):
+                    breaker.record_success()  # the provider is up, the request was bad
+                    raise
+                breaker.record_failure()
+                self.metrics.observe(f"errors:{model}", 1)
+                self.metrics.incr("llm_timeouts" if isinstance(error, TimeoutError) else "llm_errors")
+                delay = policy.delay(attempt, error) if attempt < attempts else None
+                if delay is None or breaker.state == "open":
+                    raise
+                self.metrics.incr("llm_retries")
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            self.metrics.observe(f"errors:{model}", 0)
+            return response
+    
+    def _is_healthy(self, entry: Dict[str, Any]) -> bool:
+        """Whether a model is within its latency, error rate and price ceilings"""
+        model = entry["model"]
+        metrics = self.metrics
+        if self._breaker(model).is_open():
+            return False
+        p95 = metrics.percentile(f"first_token_ms:{model}", 95)
+        if entry.get("max_p95_ms") and p95 is not None and p95 > entry["max_p95_ms"]:
+            return False
+        if metrics.count(f"errors:{model}") >= MIN_ROUTING_SAMPLES:
+            if metrics.mean(f"errors:{model}") > entry.get("max_error_rate", 0.5):
+                return False
+        cost = metrics.percentile(f"cost:{model}", 50)
+        if entry.get("max_cost") and cost is not None and cost > entry["max_cost"]:
+            return False
+        return True
+    
+    def _route(self) -> List[str]:
+        """Configured models in order, healthy ones first; the rest stay as a last resort.
+        
+        A model's samples only change when it is called, so one that has
+        been demoted for probe_after seconds has them dropped and is
+        measured again by its next call.
+        """
+        now = time.monotonic()
+        healthy = []
+        for entry in self.models:
+            model = entry["model"]
+            if not self._is_healthy(entry):
+                demoted_since = self._demoted_since.setdefault(model, now)
+                if now - demoted_since < self.probe_after:
+                    continue
+                for name in (f"first_token_ms:{model}", f"errors:{model}", f"cost:{model}"):
+                    self.metrics.forget(name)
+                self.metrics.incr("llm_route_probes")
+                if not self._is_healthy(entry):
+                    self._demoted_since[model] = now
+                    continue
+            self._demoted_since.pop(model, None)
+            healthy.append(model)
+        return healthy + [entry["model"] for entry in self.models if entry["model"] not in healthy]
+    
+    async def _routed(self, completion_kwargs: Dict[str, Any]) -> tuple[str, Any]:
+        """Run the completion on the best model, falling back along the chain.
         
-    async def get_response(self, user_message, conversation_history: List[Dict]) -> tuple[str, dict]:
-        if isinstance(user_message, str):
-            messages = conversation_history
-        else:
-            messages = [
+        With hedge_after_ms set, a model that has not produced its first
+        token in time is raced against the next one. Returns the model
+        that answered and the response (or primed stream, see _call_model).
+        """
+        route = self._route()
+        hedge_after_ms = self.character.settings.get("hedge_after_ms")
+        last_error: Optional[Exception] = None
+        index = 0
+        while index < len(route):
+            if index > 0:
+                self.metrics.incr("llm_fallbacks")
+            try:
+                if hedge_after_ms is not None and index + 1 < len(route):
+                    return await self._hedged(route[index], route[index + 1], completion_kwargs,
+                                              hedge_after_ms, last=index + 2 == len(route))
+                attempts = None if index + 1 == len(route) else 1
+                return await self._call_model(route[index], completion_kwargs, attempts)
+            except Exception as error:
+                if not (is_retryable(error) or isinstance(error, CircuitOpenError)):
+                    raise
+                last_error = error
+            index += 2 if hedge_after_ms is not None and index + 1 < len(route) else 1
+        raise last_error
+    
+    async def _hedged(self, primary: str, backup: str, completion_kwargs: Dict[str, Any],
+                      hedge_after_ms: float, last: bool) -> tuple[str, Any]:
+        """Start primary; if it has no first token after hedge_after_ms (or fails), race backup too"""
+        pending = {asyncio.create_task(self._call_model(primary, completion_kwargs, 1))}
+        backup_started = False
+        error: Optional[BaseException] = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after_ms / 1000)
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if backup_started:
+                            self.metrics.incr(f"hedge_wins:{task.result()[0]}")
+                        return task.result()
+                    error = task.exception()
+                if not backup_started:
+                    backup_started = True
+                    if not done:
+                        self.metrics.incr("llm_hedges")
+                    pending.add(asyncio.create_task(
+                        self._call_model(backup, completion_kwargs, None if last else 1)
+                    ))
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _call_model(self, model: str, completion_kwargs: Dict[str, Any],
+                          attempts: Optional[int]) -> tuple[str, Any]:
+        """Complete on one model and time its first token.
+        
+        Streams are read up to their first text delta, so a hedge races
+        on first tokens; they come back as (primed chunks, iterator).
+        """
+        started = time.perf_counter()
+        response = await self._complete(attempts, **{**completion_kwargs, "model": model})
+        if completion_kwargs.get("stream"):
+            try:
+                response = await self._prime_stream(response)
+            except BaseException:
+                await self._close_stream(response)
+                raise
+        self.metrics.observe(f"first_token_ms:{model}", (time.perf_counter() - started) * 1000)
+        return model, response
+    
+    async def _prime_stream(self, chunks) -> tuple[List[Any], AsyncIterator]:
+        iterator = chunks.__aiter__()
+        primed = []
+        while True:
+            chunk = await self._next_chunk(iterator)
+            if chunk is None:
+                break
+            primed.append(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                break
+        return primed, iterator
+    
+    async def _next_chunk(self, iterator: AsyncIterator) -> Optional[Any]:
+        """Next stream chunk or None at the end, giving up if the stream stalls past the call timeout"""
+        try:
+            async with asyncio.timeout(self.retry_policy.timeout):
+                return await anext(iterator)
+        except StopAsyncIteration:
+            return None
+        except TimeoutError:
+            self.metrics.incr("llm_timeouts")
+            raise
+    
+    @staticmethod
+    async def _close_stream(chunks):
+        close = getattr(chunks, "aclose", None) or getattr(chunks, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+    
+    def _build_messages(self, user_message, conversation_history: List[Dict],
+                        stable_prefix: int = 0) -> List[Dict]:
+        if not isinstance(user_message, str):
+            conversation_history = [
                 *conversation_history[:-1],
                 {"role": "user", "content": user_message}
             ]
-        
+        if stable_prefix and self._uses_cache_control():
+            return self._with_cache_control(conversation_history, stable_prefix)
+        return conversation_history
+    
+    def _uses_cache_control(self) -> bool:
+        setting = self.character.settings.get("prompt_cache", "auto")
+        if setting == "auto":
+            return self.model.startswith(CACHE_CONTROL_PREFIXES)
+        return bool(setting)
+    
+    @staticmethod
+    def _with_cache_control(messages: List[Dict], stable_prefix: int) -> List[Dict]:
+        """Mark the system prompt and the end of the stable history as cache breakpoints"""
+        breakpoints = {0, min(stable_prefix, len(messages)) - 1}
+        marked = []
+        for index, message in enumerate(messages):
+            if index in breakpoints:
+                content = message["content"]
+                parts = [{"type": "text", "text": content}] if isinstance(content, str) else list(content)
+                if parts:
+                    parts[-1] = {**parts[-1], "cache_control": {"type": "ephemeral"}}
+                message = {**message, "content": parts}
+            marked.append(message)
+        return marked
+    
+    def _build_completion_kwargs(self, messages: List[Dict]) -> Dict[str, Any]:
         completion_kwargs = {
             "model": self.model,
             "messages": messages,
-            "api_key": self.character.api_key,
             "temperature": self.character.settings["temperature"],
             "top_p": self.character.settings.get("top_p", 0.9),
             "max_tokens": self.character.settings["max_tokens"],
@@ -33,41 +307,270 @@ class LLMService:
         if self.character.settings.get("reasoning_effort"):
             completion_kwargs["reasoning_effort"] = self.character.settings["reasoning_effort"]
         
-        response = completion(**completion_kwargs)
+        return completion_kwargs
+    
+    async def get_response(self, user_message, conversation_history: List[Dict],
+                           on_usage: Optional[Callable[[dict], None]] = None,
+                           stable_prefix: int = 0) -> tuple[str, dict]:
+        """Return the reply and the usage reported with the completion.
         
+        If the provider did not include a cost, it is looked up in the
+        background and the difference is passed to on_usage once known.
+        stable_prefix is the number of leading messages that repeat
+        unchanged from turn to turn; they are marked for prompt caching.
+        """
+        messages = self._build_messages(user_message, conversation_history, stable_prefix)
+        
+        # acompletion runs on the caller's event loop, so Discord heartbeats,
+        # typing indicators and queued messages keep flowing during the call
+        async with self.limiter:
+            started = time.perf_counter()
+            model, response = await self._routed(self._build_completion_kwargs(messages))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics.observe("ttft_ms", elapsed_ms)
+        self.metrics.observe("latency_ms", elapsed_ms)
+        
+        usage = self._usage_from_completion(response)
+        self._record_usage(model, usage)
+        self._schedule_usage_lookup(getattr(response, 'id', None), usage, on_usage, model)
+        
+        return response.choices[0].message.content, usage
+    
+    def stream_response(self, user_message, conversation_history: List[Dict],
+                        on_usage: Optional[Callable[[dict], None]] = None,
+                        stable_prefix: int = 0) -> "ResponseStream":
+        """Stream the reply as text deltas; see ResponseStream"""
+        messages = self._build_messages(user_message, conversation_history, stable_prefix)
+        return ResponseStream(self, self._build_completion_kwargs(messages), on_usage)
+    
+    async def summarize(self, previous_summary: str, messages: List[Dict],
+                        on_usage: Optional[Callable[[dict], None]] = None) -> tuple[str, dict]:
+        """Fold messages into a running summary; usable as Memory.summarizer"""
+        transcript = "\n".join(
+            f"{message['role']}: {self._content_to_text(message['content'])}"
+            for message in messages
+        )
+        return await self.get_response("", [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": (
+                f"Previous summary:\n{previous_summary or '(none)'}\n\n"
+                f"New messages:\n{transcript}"
+            )}
+        ], on_usage=on_usage)
+    
+    async def classify_reply(self, model: str, messages: List[Dict]) -> bool:
+        """Ask a small model whether the character would reply; usable as a gate classifier"""
+        transcript = "\n".join(self._content_to_text(message["content"]) for message in messages)
+        async with self.limiter:
+            response = await self._complete(
+                model=model,
+                messages=[
+                    {"role": "system", "content": GATE_PROMPT.format(persona=self.character.character_card[:1000])},
+                    {"role": "user", "content": transcript}
+                ],
+                temperature=0.0,
+                max_tokens=3
+            )
+        self.metrics.incr("gate_classifier_calls")
+        answer = response.choices[0].message.content or ""
+        return answer.strip().upper().startswith("YES")
+    
+    @staticmethod
+    def _content_to_text(content) -> str:
+        if isinstance(content, str):
+            return content
+        parts = [item.get("text", "") if item.get("type") == "text" else "[image]" for item in content]
+        return " ".join(part for part in parts if part)
+    
+    def _record_usage(self, model: str, usage: dict):
+        if not usage:
+            return
+        self.metrics.observe("completion_tokens", usage["completion_tokens"])
+        self.metrics.incr("cached_prompt_tokens", usage.get("cached_tokens", 0))
+        if usage.get('cost') is not None:
+            self.metrics.observe(f"cost:{model}", usage['cost'])
+    
+    def _schedule_usage_lookup(self, generation_id: Optional[str], usage: dict,
+                               on_usage: Optional[Callable[[dict], None]], model: Optional[str] = None):
+        if on_usage and 'cost' not in usage and generation_id:
+            task = asyncio.create_task(self._reconcile_usage(generation_id, usage, on_usage, model))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+    
+    def _usage_from_completion(self, response) -> dict:
         usage = {}
+        completion_usage = getattr(response, 'usage', None)
+        if not completion_usage:
+            return usage
+        
+        usage['prompt_tokens'] = completion_usage.prompt_tokens or 0
+        usage['completion_tokens'] = completion_usage.completion_tokens or 0
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        details = getattr(completion_usage, 'prompt_tokens_details', None)
+        cached_tokens = getattr(details, 'cached_tokens', None)
+        if cached_tokens:
+            usage['cached_tokens'] = cached_tokens
+        # OpenRouter reports cost inline as an extra usage field
+        cost = getattr(completion_usage, 'cost', None)
+        if cost is not None:
+            usage['cost'] = cost
+        return usage
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=self._connector,
+                connector_owner=self._connector is None,
+                timeout=aiohttp.ClientTimeout(total=5)
+            )
+        return self._session
+    
+    async def _fetch_generation(self, generation_id: str) -> Optional[dict]:
+        """Poll the generation endpoint until its stats are available"""
+        session = await self._get_session()
+        headers = {'Authorization': f'Bearer {self.character.api_key}'}
+        url = f'{self.api_base or OPENROUTER_API_BASE}/generation'
+        
+        await asyncio.sleep(self.usage_lookup_delay)
+        for attempt in range(3):
+            if attempt > 0:
+                await asyncio.sleep(1)
+            try:
+                async with session.get(url, params={'id': generation_id}, headers=headers) as gen_response:
+                    if gen_response.status == 200:
+                        return (await gen_response.json()).get('data', {})
+                    if gen_response.status != 404:
+                        return None
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+        return None
+    
+    async def _reconcile_usage(self, generation_id: str, usage: dict, on_usage: Callable[[dict], None],
+                               model: Optional[str] = None):
+        """Report cost and native token counts that differ from the completion's usage"""
+        gen_data = await self._fetch_generation(generation_id)
+        if not gen_data:
+            return
+        
+        correction = {'cost': gen_data.get('total_cost', 0)}
+        if model:
+            self.metrics.observe(f"cost:{model}", correction['cost'])
+        if gen_data.get('native_tokens_prompt'):
+            correction['prompt_tokens'] = gen_data['native_tokens_prompt'] - usage.get('prompt_tokens', 0)
+        if gen_data.get('native_tokens_completion'):
+            correction['completion_tokens'] = gen_data['native_tokens_completion'] - usage.get('completion_tokens', 0)
+        on_usage(correction)
+    
+    def reliability_summary(self) -> Optional[str]:
+        """Retry, timeout and circuit breaker counters for /stats; None if nothing went wrong"""
+        counters = self.metrics.counters
+        names = ("llm_retries", "llm_timeouts", "llm_errors", "llm_circuit_rejected", "llm_fallbacks", "llm_hedges")
+        not_closed = [f"{model} {breaker.state}" for model, breaker in self.breakers.items() if breaker.state != "closed"]
+        if not any(counters.get(name) for name in names) and not not_closed:
+            return None
+        summary = (
+            f"{counters.get('llm_retries', 0):.0f} retries, {counters.get('llm_timeouts', 0):.0f} timeouts, "
+            f"{counters.get('llm_errors', 0):.0f} errors, {counters.get('llm_circuit_rejected', 0):.0f} rejected, "
+            f"{counters.get('llm_fallbacks', 0):.0f} fallbacks, {counters.get('llm_hedges', 0):.0f} hedges"
+        )
+        if not_closed:
+            summary += f"; circuit {', '.join(not_closed)}"
+        return summary
+    
+    def describe_model_stats(self) -> Dict[str, str]:
+        """model_stats as display strings, for /stats"""
+        lines = {}
+        for model, stats in self.model_stats().items():
+            latency = (
+                f"p50 {stats['p50_ms']:.0f}ms / p95 {stats['p95_ms']:.0f}ms"
+                if stats["p50_ms"] is not None else "no calls yet"
+            )
+            errors = f", {stats['error_rate']:.0%} errors" if stats["error_rate"] is not None else ""
+            lines[model] = latency + errors
+        return lines
+    
+    def model_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Rolling first-token latency and error rate per model in the chain"""
+        return {
+            entry["model"]: {
+                "p50_ms": self.metrics.percentile(f"first_token_ms:{entry['model']}", 50),
+                "p95_ms": self.metrics.percentile(f"first_token_ms:{entry['model']}", 95),
+                "error_rate": self.metrics.mean(f"errors:{entry['model']}"),
+            }
+            for entry in self.models
+        }
+    
+    async def aclose(self):
+        """Let pending usage lookups finish, then release the HTTP session"""
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+
+class ResponseStream:
+    """Async iterator over the text deltas of a streaming completion.
+    
+    Once iteration finishes, text holds the full reply and usage the
+    usage block sent with the final chunk.
+    """
+    
+    def __init__(self, service: LLMService, completion_kwargs: Dict[str, Any],
+                 on_usage: Optional[Callable[[dict], None]] = None):
+        self.service = service
+        self.completion_kwargs = completion_kwargs
+        self.on_usage = on_usage
+        self.usage: dict = {}
+        self.time_to_first_token: Optional[float] = None  # seconds
+        self.model: Optional[str] = None  # the model that answered
+        self._parts: List[str] = []
+    
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+    
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+    
+    async def _iterate(self) -> AsyncIterator[str]:
+        async with self.service.limiter:
+            async for delta in self._iterate_chunks():
+                yield delta
+    
+    async def _iterate_chunks(self) -> AsyncIterator[str]:
+        metrics = self.service.metrics
+        started = time.perf_counter()
+        self.model, (primed, iterator) = await self.service._routed({
+            **self.completion_kwargs,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        })
+        
+        generation_id = None
+        async for chunk in self._chunks(primed, iterator):
+            generation_id = generation_id or getattr(chunk, 'id', None)
+            if getattr(chunk, 'usage', None):
+                self.usage = self.service._usage_from_completion(chunk)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - started
+                metrics.observe("ttft_ms", self.time_to_first_token * 1000)
+            self._parts.append(delta)
+            yield delta
         
-        if hasattr(response, 'id'):
-            generation_id = response.id
-            await asyncio.sleep(2)
-            
-            for attempt in range(3):
-                try:
-                    if attempt > 0:
-                        await asyncio.sleep(1)
-                    
-                    headers = {'Authorization': f'Bearer {self.character.api_key}'}
-                    gen_response = requests.get(
-                        f'https://openrouter.ai/api/v1/generation?id={generation_id}',
-                        headers=headers,
-                        timeout=5
-                    )
-                    
-                    if gen_response.status_code == 200:
-                        gen_data = gen_response.json().get('data', {})
-                        usage['cost'] = gen_data.get('total_cost', 0)
-                        if gen_data.get('native_tokens_prompt'):
-                            usage['prompt_tokens'] = gen_data.get('native_tokens_prompt', 0)
-                        if gen_data.get('native_tokens_completion'):
-                            usage['completion_tokens'] = gen_data.get('native_tokens_completion', 0)
-                        usage['total_tokens'] = usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
-                        break
-                    elif gen_response.status_code == 404 and attempt < 2:
-                        continue
-                    else:
-                        break
-                except:
-                    if attempt == 2:
-                        break
-                
-        return response.choices[0].message.content, usage
\ No newline at end of file
+        metrics.observe("latency_ms", (time.perf_counter() - started) * 1000)
+        self.service._record_usage(self.model, self.usage)
+        self.service._schedule_usage_lookup(generation_id, self.usage, self.on_usage, self.model)
+    
+    async def _chunks(self, primed: List[Any], iterator: AsyncIterator) -> AsyncIterator:
+        for chunk in primed:
+            yield chunk
+        try:
+            while (chunk := await self.service._next_chunk(iterator)) is not None:
+                yield chunk
+        finally:
+            await self.service._close_stream(iterator)
@@ -1,42 +1,285 @@
-from typing import List, Dict, Any, Union
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass, field
+from pyopenbot.attachments import AttachmentStore
+from pyopenbot.store import ConversationStore, DEFAULT_STORE_DIR
+from pyopenbot.tokens import count_message_tokens, count_tokens
+import asyncio
+
+
+MEMORY_TYPES = ["unlimited", "sliding_window", "token_budget", "summary"]
+
+# (previous summary, messages to fold, callback for usage that arrives later) -> (summary, usage)
+Summarizer = Callable[[str, List[Dict], Callable[[dict], None]], Awaitable[Tuple[str, dict]]]
 
 
 @dataclass
 class Memory:
-    type: str  # "unlimited" for now
+    type: str  # one of MEMORY_TYPES
     messages: List[Dict] = field(default_factory=list)
     max_context: int = 8192
     total_cost: float = 0.0
     total_prompt_tokens: int = 0
     total_completion_tokens: int = 0
-    
+    total_cached_tokens: int = 0  # prompt tokens served from the provider's prompt cache
+    max_messages: int = 50  # sliding_window only
+    system_tokens: int = 0  # estimated size of the system prompt sent with every request
+    reply_tokens: int = 0  # room kept free for the reply (max_tokens)
+    summarize_after: int = 4096  # summary only: history tokens that trigger folding
+    keep_recent: int = 10  # summary only: newest messages always kept verbatim
+    summarizer: Optional[Summarizer] = field(default=None, repr=False)
+    summary: str = ""
+    summaries_made: int = 0
+    store: Optional[ConversationStore] = field(default=None, repr=False)
+    attachments: Optional[AttachmentStore] = field(default=None, repr=False)
+    image_turns: int = 3  # images older than this many user turns become placeholders
+    trim_slack: float = 0.0  # extra fraction trimmed at once, so the prompt prefix stays stable for a while
+    usage_listener: Optional[Callable[[dict], None]] = field(default=None, repr=False)  # sees every add_usage
+    _summary_tokens: int = field(default=0, repr=False)
+    _folded_tokens: int = field(default=0, repr=False)  # history tokens the summary replaces
+    _summary_task: Optional[asyncio.Task] = field(default=None, repr=False)
+    _generation: int = field(default=0, repr=False)  # bumped by clear()
+    _token_counts: List[int] = field(default_factory=list, repr=False)
+    _context_tokens: int = field(default=0, repr=False)
+
+    @classmethod
+    def from_character(cls, character, system_prompt: Optional[str] = None,
+                       summarizer: Optional[Summarizer] = None,
+                       channel: str = "terminal",
+                       attachments: Optional[AttachmentStore] = None) -> "Memory":
+        settings = character.settings
+        memory_settings = character.memory_settings
+        if system_prompt is None:
+            system_prompt = character.character_card
+        memory = cls(
+            type=character.memory_type,
+            max_context=settings.get("context_window", 8192),
+            max_messages=memory_settings.get("max_messages", 50),
+            summarize_after=memory_settings.get(
+                "summarize_after", settings.get("context_window", 8192) // 2
+            ),
+            keep_recent=memory_settings.get("keep_recent", 10),
+            summarizer=summarizer,
+            attachments=attachments or AttachmentStore.from_settings(memory_settings),
+            image_turns=max(1, memory_settings.get("image_turns", 3)),
+            trim_slack=memory_settings.get("trim_slack", 0.2),
+            system_tokens=count_tokens(system_prompt),
+            reply_tokens=settings.get("max_tokens", 0)
+        )
+        if memory_settings.get("persist"):
+            store = ConversationStore.for_conversation(
+                memory_settings.get("persist_dir", DEFAULT_STORE_DIR),
+                character.character_name,
+                channel
+            )
+            default_tail = memory.max_messages if memory.type == "sliding_window" else 500
+            memory.attach_store(store, memory_settings.get("persist_tail", default_tail))
+        return memory
+
+    def attach_store(self, store: ConversationStore, tail: int):
+        """Restore the newest messages and usage totals, then persist from here on"""
+        for message in store.load_tail(tail):
+            self._append(message)
+        usage = store.load_usage()
+        self.total_cost = usage.get("total_cost", 0.0)
+        self.total_prompt_tokens = usage.get("total_prompt_tokens", 0)
+        self.total_completion_tokens = usage.get("total_completion_tokens", 0)
+        self.total_cached_tokens = usage.get("total_cached_tokens", 0)
+        self.store = store
+
     def add_message(self, role: str, content: Union[str, List[Dict]]):
-        self.messages.append({"role": role, "content": content})
-    
+        message = {"role": role, "content": content}
+        if self.store:
+            self.store.append_message(message)
+        self._append(message)
+
+    def _append(self, message: Dict):
+        tokens = count_message_tokens(message)
+        self.messages.append(message)
+        self._token_counts.append(tokens)
+        self._context_tokens += tokens
+        if self.type == "summary":
+            self._maybe_summarize()
+        self._trim()
+
+    def _trim(self):
+        """Drop the oldest messages until the history fits this memory type.
+        
+        Once over the limit, trim_slack more is dropped in the same go, so
+        the following turns share an unchanged prefix the provider can cache.
+        """
+        if self.type == "sliding_window":
+            drop = len(self.messages) - self.max_messages
+            if drop > 0:
+                drop = min(drop + int(self.max_messages * self.trim_slack), len(self.messages) - 1)
+        elif self.type in ("token_budget", "summary"):
+            # summary trims too, as a safety net when folding can't keep up
+            budget = self._history_budget()
+            drop = 0
+            excess = self._context_tokens - budget
+            if excess > 0:
+                excess += int(budget * self.trim_slack)
+            # Always keep the newest message, even if it alone is over budget
+            while excess > 0 and drop < len(self.messages) - 1:
+                excess -= self._token_counts[drop]
+                drop += 1
+        else:
+            return
+
+        if drop > 0:
+            self._drop_oldest(drop)
+
+    def _history_budget(self) -> int:
+        return self.max_context - self.system_tokens - self.reply_tokens - self._summary_tokens
+
+    def capacity(self) -> Tuple[Optional[int], Optional[int]]:
+        """Most messages and history tokens this memory keeps; None where it has no limit"""
+        if self.type == "sliding_window":
+            return self.max_messages, None
+        if self.type in ("token_budget", "summary"):
+            return None, self._history_budget()
+        return None, None
+
+    def _drop_oldest(self, count: int) -> int:
+        dropped_tokens = sum(self._token_counts[:count])
+        self._context_tokens -= dropped_tokens
+        del self.messages[:count]
+        del self._token_counts[:count]
+        return dropped_tokens
+
+    def _maybe_summarize(self):
+        """Fold older messages into the summary in the background once over threshold"""
+        if self.summarizer is None or self._context_tokens <= self.summarize_after:
+            return
+        if self._summary_task and not self._summary_task.done():
+            return
+        if len(self.messages) <= self.keep_recent:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._summary_task = asyncio.create_task(self._summarize())
+
+    async def _summarize(self):
+        generation = self._generation
+        fold = len(self.messages) - self.keep_recent
+        to_fold = self.messages[:fold]
+        try:
+            summary, usage = await self.summarizer(self.summary, to_fold, self.add_usage)
+        except Exception:
+            return  # keep the history verbatim; the next message retries
+        if generation != self._generation:
+            return  # cleared while summarizing
+
+        # Trimming may have dropped some of the folded messages meanwhile
+        self._folded_tokens += self._drop_oldest(self._index_after(to_fold[-1], len(to_fold)))
+        self.summary = summary
+        self._summary_tokens = count_message_tokens(self._summary_message())
+        self.summaries_made += 1
+        if usage:
+            self.add_usage(usage)
+
+    def _index_after(self, message: Dict, limit: int) -> int:
+        for i, existing in enumerate(self.messages[:limit]):
+            if existing is message:
+                return i + 1
+        return 0
+
+    def _summary_message(self) -> Dict:
+        return {"role": "system", "content": f"[Summary of earlier conversation]\n{self.summary}"}
+
     def add_usage(self, usage: dict):
         self.total_cost += usage.get('cost', 0.0)
         self.total_prompt_tokens += usage.get('prompt_tokens', 0)
         self.total_completion_tokens += usage.get('completion_tokens', 0)
-    
+        self.total_cached_tokens += usage.get('cached_tokens', 0)
+        if self.store:
+            self.store.save_usage(self._usage_totals())
+        if self.usage_listener:
+            self.usage_listener(usage)
+
+    def _usage_totals(self) -> Dict[str, Any]:
+        return {
+            "total_cost": self.total_cost,
+            "total_prompt_tokens": self.total_prompt_tokens,
+            "total_completion_tokens": self.total_completion_tokens,
+            "total_cached_tokens": self.total_cached_tokens
+        }
+
     def clear(self):
+        self._generation += 1
+        if self._summary_task and not self._summary_task.done():
+            self._summary_task.cancel()
+        self.summary = ""
+        self._summary_tokens = 0
+        self._folded_tokens = 0
         self.messages = []
+        self._token_counts = []
+        self._context_tokens = 0
         self.total_cost = 0.0
         self.total_prompt_tokens = 0
         self.total_completion_tokens = 0
-    
+        self.total_cached_tokens = 0
+        if self.store:
+            self.store.append_clear()
+            self.store.save_usage(self._usage_totals())
+
+    def close(self):
+        if self.store:
+            self.store.close()
+
     def get_messages(self) -> List[Dict]:
-        return self.messages
-    
+        messages = self._resolve_images(self.messages)
+        if self.summary:
+            return [self._summary_message(), *messages]
+        return messages
+
+    def _resolve_images(self, messages: List[Dict]) -> List[Dict]:
+        """Inline recent image references as data URLs, older ones as placeholders"""
+        if not any(isinstance(message["content"], list) for message in messages):
+            return messages
+
+        resolved = []
+        turns = 0
+        for message in reversed(messages):
+            if message["role"] == "user":
+                turns += 1
+            content = message["content"]
+            if isinstance(content, list) and any(item.get("type") == "image_ref" for item in content):
+                message = {**message, "content": [
+                    self._resolve_image(item, turns <= self.image_turns)
+                    if item.get("type") == "image_ref" else item
+                    for item in content
+                ]}
+            resolved.append(message)
+        resolved.reverse()
+        return resolved
+
+    def _resolve_image(self, item: Dict, inline: bool) -> Dict:
+        url = self.attachments.data_url(item["image_ref"]) if inline and self.attachments else None
+        if url is None:
+            return {"type": "text", "text": "[image]"}
+        return {"type": "image_url", "image_url": {"url": url}}
+
+    def get_context_tokens(self) -> int:
+        """Estimated prompt size of the next request: system prompt plus history"""
+        return self.system_tokens + self._summary_tokens + self._context_tokens
+
     def get_stats(self) -> Dict[str, Any]:
         total_tokens = self.total_prompt_tokens + self.total_completion_tokens
-        
+        context_tokens = self.get_context_tokens()
+
         return {
             "message_count": len(self.messages),
             "total_cost": self.total_cost,
             "prompt_tokens": self.total_prompt_tokens,
             "completion_tokens": self.total_completion_tokens,
+            "cached_tokens": self.total_cached_tokens,
             "total_tokens": total_tokens,
-            "context_usage": f"{total_tokens}/{self.max_context}",
-            "context_percentage": (total_tokens / self.max_context) * 100 if self.max_context > 0 else 0
-        }
\ No newline at end of file
+            "context_tokens": context_tokens,
+            "context_usage": f"{context_tokens}/{self.max_context}",
+            "context_percentage": (context_tokens / self.max_context) * 100 if self.max_context > 0 else 0,
+            "summaries_made": self.summaries_made,
+            # tokens every request saves by sending the summary instead of the folded turns
+            "tokens_saved_per_turn": max(0, self._folded_tokens - self._summary_tokens)
+        }
@@ -0,0 +1,46 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional
+
+
+@dataclass
+class Metrics:
+    """Counters and rolling samples reported by /stats"""
+    window: int = 200  # samples kept per metric for percentiles
+    counters: Dict[str, float] = field(default_factory=dict)
+    samples: Dict[str, Deque[float]] = field(default_factory=dict)
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float) -> None:
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.window)
+        self.samples[name].append(value)
+
+    def forget(self, name: str) -> None:
+        self.samples.pop(name, None)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        values = self.samples.get(name)
+        if not values:
+            return None
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def mean(self, name: str) -> Optional[float]:
+        values = self.samples.get(name)
+        if not values:
+            return None
+        return sum(values) / len(values)
+
+    def count(self, name: str) -> int:
+        return len(self.samples.get(name, ()))
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self.counters)
+        for name in self.samples:
+            stats[f"{name}_p50"] = self.percentile(name, 50)
+            stats[f"{name}_p95"] = self.percentile(name, 95)
+        return stats
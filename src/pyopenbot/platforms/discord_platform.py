@@ -1,18 +1,36 @@
 import discord
 from discord.ext import commands
 from pyopenbot.platforms.base_platform import BasePlatform
+from pyopenbot.platforms.discord_sender import DiscordSender, split_message
 from pyopenbot.llm_service import LLMService
+from pyopenbot.attachments import AttachmentStore
+from pyopenbot.channel_buffer import ChannelBuffer
+from pyopenbot.gate import ResponseGate
+from pyopenbot.images import ImagePreprocessor
 from pyopenbot.memory import Memory
-from typing import Dict, List, Optional
+from pyopenbot.tokens import count_message_tokens, count_tokens
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
 from rich.console import Console
 import asyncio
 import aiohttp
-import base64
+import yarl
+
+
+@dataclass
+class ChannelState:
+    """Queue, memory and worker of one Discord channel"""
+    memory: Memory
+    queue: ChannelBuffer = field(default_factory=ChannelBuffer)
+    gate: Optional[ResponseGate] = None
+    worker: Optional[asyncio.Task] = None
 
 
 class DiscordPlatform(BasePlatform):
     """Discord platform implementation for PyOpenBot"""
     
+    RESUME_PROGRESS_EVERY = 200  # /resume edits its progress message after this many messages
+    
     DISCORD_CONTEXT_PROMPT = """
 [Discord Context]
 You're in a Discord chat. Messages marked [username - PENDING] arrived while you were typing your response.
@@ -55,13 +73,26 @@ When to use [NO_RESPONSE]:
 Remember: Stay in character. An enthusiastic assistant might respond often, while a reserved character might be selective.
 Be natural. Be human. Don't explain your message reading process."""
     
-    def __init__(self, character, llm_service: LLMService, memory: Memory):
+    def __init__(self, character, llm_service: LLMService, memory_factory: Callable[[str], Memory],
+                 connector: Optional[aiohttp.BaseConnector] = None):
         self.character = character
         self.llm_service = llm_service
-        self.memory = memory
+        self.memory_factory = memory_factory  # builds the Memory of a channel from its id
+        self.channels: Dict[str, ChannelState] = {}
+        self.accepting = True  # cleared by shutdown()
+        self.channel_ids, self.all_channels = self._parse_channel_ids(character.discord_channel_id)
+        self.attachments = AttachmentStore()
         self.console = Console()
-        self.message_queue = asyncio.Queue()
-        self.processing_task = None
+        # Shared pool for image downloads when several bots run in one process;
+        # discord.py keeps its own, since it closes its connector on logout
+        self.connector = connector
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        self.image_preprocessor = self._create_image_preprocessor()
+        self.sender = DiscordSender(
+            rate=character.discord_settings.get("send_rate", 1.0),
+            burst=character.discord_settings.get("send_burst", 5),
+            coalesce=character.discord_settings.get("coalesce_sends", True)
+        )
         
         intents = discord.Intents.default()
         intents.message_content = True
@@ -75,9 +106,6 @@ Be natural. Be human. Don't explain your message reading process."""
         async def on_ready():
             self.console.print(f'[green]✓ {self.bot.user} connected to Discord![/green]')
             self.console.print(f'[cyan]Bot is in {len(self.bot.guilds)} servers[/cyan]')
-            # Start the message processing task
-            if not self.processing_task:
-                self.processing_task = asyncio.create_task(self.process_message_queue())
         
         @self.bot.event
         async def on_message(message: discord.Message):
@@ -92,7 +120,7 @@ Be natural. Be human. Don't explain your message reading process."""
             
             # Check if we should respond to this message
             if self._should_respond(message):
-                await self.message_queue.put(message)
+                await self.enqueue_message(message)
     
     def _setup_commands(self):
         
@@ -120,15 +148,77 @@ Be natural. Be human. Don't explain your message reading process."""
         async def resume_conversation(ctx, count: int):
             await self._cmd_resume(ctx, count)
     
+    @staticmethod
+    def _parse_channel_ids(channel_id) -> tuple[set, bool]:
+        """Accept one id, a list of ids, or "*" for every channel"""
+        if channel_id is None:
+            return set(), False
+        ids = channel_id if isinstance(channel_id, list) else [channel_id]
+        ids = {str(value).strip() for value in ids}
+        return ids - {"*"}, "*" in ids
+    
     def _should_respond(self, message: discord.Message) -> bool:
-        if self.character.discord_channel_id:
-            return str(message.channel.id) == str(self.character.discord_channel_id)
-        return False
+        return self.all_channels or str(message.channel.id) in self.channel_ids
+    
+    def _channel(self, channel_id) -> ChannelState:
+        """Return the state of a channel, creating its memory on first use"""
+        key = str(channel_id)
+        state = self.channels.get(key)
+        if state is None:
+            memory = self.memory_factory(key)
+            memory.system_tokens = count_tokens(self._build_enhanced_system_prompt())
+            if memory.attachments is None:
+                memory.attachments = self.attachments
+            state = self.channels[key] = ChannelState(memory=memory, gate=self._create_gate())
+        return state
+    
+    def _create_gate(self) -> Optional[ResponseGate]:
+        settings = self.character.discord_settings.get("gate")
+        if not settings:
+            return None
+        model = settings.get("classifier_model")
+        return ResponseGate.from_settings(
+            settings,
+            classifier=lambda messages: self.llm_service.classify_reply(model, messages)
+        )
+    
+    def _addresses_bot(self, message: discord.Message) -> bool:
+        """Mentions of the bot and replies to its messages"""
+        if self.bot.user is None:
+            return False
+        if self.bot.user in getattr(message, "mentions", []):
+            return True
+        reference = getattr(message, "reference", None)
+        resolved = getattr(reference, "resolved", None)
+        return getattr(resolved, "author", None) == self.bot.user
+    
+    async def _passes_gate(self, state: ChannelState, messages: List[discord.Message]) -> bool:
+        """Run the channel's gate over the newest messages; without a gate everything passes"""
+        if state.gate is None:
+            return True
+        passed = await state.gate.should_reply(
+            " ".join(self._clean_message_content(message) for message in messages),
+            any(self._addresses_bot(message) for message in messages),
+            state.memory.messages
+        )
+        self.llm_service.metrics.incr("gate_passed" if passed else "gate_skipped")
+        return passed
+    
+    async def enqueue_message(self, message: discord.Message):
+        """Queue a message on its channel and make sure the channel has a worker"""
+        if not self.accepting:
+            return
+        state = self._channel(message.channel.id)
+        state.queue.put(message, self._format_pending_message(message))
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.create_task(self.process_channel_queue(state))
     
     def _clean_message_content(self, message: discord.Message) -> str:
         """Clean message content by removing bot mentions"""
-        content = message.content.replace(f'<@{self.bot.user.id}>', '').strip()
-        return content
+        content = message.content
+        if self.bot.user:
+            content = content.replace(f'<@{self.bot.user.id}>', '')
+        return content.strip()
     
     def _get_image_attachments(self, message: discord.Message) -> list:
         images = []
@@ -137,17 +227,75 @@ Be natural. Be human. Don't explain your message reading process."""
                 images.append(attachment)
         return images
     
-    async def _convert_image_to_base64_url(self, image_url: str) -> str:
-        """Download image and convert to base64 data URL"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(image_url) as response:
-                if response.status == 200:
-                    image_data = await response.read()
-                    base64_string = base64.b64encode(image_data).decode('utf-8')
-                    content_type = response.headers.get('content-type', 'image/png')
-                    return f"data:{content_type};base64,{base64_string}"
-                else:
-                    raise Exception(f"Failed to download image: {response.status}")
+    def _create_image_preprocessor(self) -> Optional[ImagePreprocessor]:
+        settings = self.character.discord_settings
+        if not settings.get("preprocess_images"):
+            return None
+        if not ImagePreprocessor.available():
+            self.console.print("[yellow]preprocess_images needs Pillow: pip install pyopenbot[images][/yellow]")
+            return None
+        return ImagePreprocessor(
+            max_edge=settings.get("image_max_edge", 1568),
+            image_format=settings.get("image_format", "webp"),
+            quality=settings.get("image_quality", 85)
+        )
+    
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """One pooled session for the platform's lifetime"""
+        if self.http_session is None or self.http_session.closed:
+            timeout = self.character.discord_settings.get("image_timeout", 15)
+            self.http_session = aiohttp.ClientSession(
+                connector=self.connector,
+                connector_owner=self.connector is None,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            )
+        return self.http_session
+    
+    async def _download_images(self, images: List[discord.Attachment]) -> List:
+        """Download all attachments of a message concurrently.
+        
+        Returns (bytes, content type) per attachment, or the exception
+        that stopped its download.
+        """
+        return await asyncio.gather(
+            *(self._download_image(attachment) for attachment in images),
+            return_exceptions=True
+        )
+    
+    async def _download_image(self, attachment: discord.Attachment) -> tuple[bytes, str]:
+        """Download image and return its bytes and content type"""
+        if self.image_preprocessor:
+            cached = self.image_preprocessor.cached(attachment.id)
+            if cached:
+                return cached
+        
+        max_bytes = int(self.character.discord_settings.get("max_image_mb", 8) * 1024 * 1024)
+        if attachment.size > max_bytes:
+            raise Exception(f"Image too large: {attachment.size} bytes")
+        
+        try:
+            image_data = await self._fetch_capped(attachment.url, max_bytes)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # The media proxy often answers when the CDN URL does not
+            image_data = await self._fetch_capped(attachment.proxy_url, max_bytes)
+        content_type = attachment.content_type or 'image/png'
+        if self.image_preprocessor:
+            return await self.image_preprocessor.process(attachment.id, image_data, content_type)
+        return image_data, content_type
+    
+    async def _fetch_capped(self, url: str, max_bytes: int) -> bytes:
+        async with self._get_http_session().get(url) as response:
+            if response.status != 200:
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history, status=response.status,
+                    message=f"Failed to download image: {response.status}"
+                )
+            image_data = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                image_data.extend(chunk)
+                if len(image_data) > max_bytes:
+                    raise Exception(f"Image larger than {max_bytes} bytes")
+            return bytes(image_data)
     
     def _format_pending_message(self, message: discord.Message) -> Dict[str, str]:
         """Format a message as a pending message for LLM context"""
@@ -158,29 +306,14 @@ Be natural. Be human. Don't explain your message reading process."""
             "content": f"[{username} - PENDING]: {content}"
         }
     
-    async def _get_pending_messages(self) -> tuple[List[Dict], List[discord.Message]]:
-        """Get pending messages from queue without removing them"""
-        pending_messages = []
-        temp_queue = []
-        
-        while not self.message_queue.empty():
-            try:
-                pending_msg = self.message_queue.get_nowait()
-                temp_queue.append(pending_msg)
-                pending_messages.append(self._format_pending_message(pending_msg))
-            except asyncio.QueueEmpty:
-                break
-        
-        # Put messages back in queue
-        for msg in temp_queue:
-            await self.message_queue.put(msg)
-        
-        return pending_messages, temp_queue
+    def _get_pending_messages(self, state: ChannelState) -> List[Dict]:
+        """Messages still waiting in the channel queue, formatted on arrival"""
+        return state.queue.peek()
     
     def _build_enhanced_system_prompt(self) -> str:
         return f"{self.character.character_card}\n{self.DISCORD_CONTEXT_PROMPT}"
     
-    def _build_llm_context(self, content, username: str, pending_messages: List[Dict]) -> List[Dict]:
+    def _build_llm_context(self, memory: Memory, content, username: str, pending_messages: List[Dict]) -> List[Dict]:
         """Build the complete message context for the LLM"""
         if isinstance(content, list):
             has_text = any(item.get("type") == "text" and item.get("text") for item in content)
@@ -193,13 +326,23 @@ Be natural. Be human. Don't explain your message reading process."""
         
         return [
             {"role": "system", "content": self._build_enhanced_system_prompt()},
-            *self.memory.get_messages(),
+            *memory.get_messages(),
             *pending_messages,
             {"role": "system", "content": response_indicator}
         ]
     
     async def process_single_message(self, message: discord.Message):
         """Process a single Discord message"""
+        await self.process_messages([message])
+    
+    async def _store_user_message(self, memory: Memory, message: discord.Message):
+        """Add a user message to memory and return its content for the response indicator"""
+        memory_content, indicator_content = await self._user_content(memory, message)
+        memory.add_message("user", memory_content)
+        return indicator_content
+    
+    async def _user_content(self, memory: Memory, message: discord.Message) -> tuple:
+        """Memory content of a user message, with its images, and content for the response indicator"""
         content = self._clean_message_content(message)
         username = message.author.name
         
@@ -210,96 +353,303 @@ Be natural. Be human. Don't explain your message reading process."""
             memory_content = [
                 {"type": "text", "text": text_content}
             ]
-            for img in images:
-                try:
-                    base64_url = await self._convert_image_to_base64_url(img.url)
-                    memory_content.append({
-                        "type": "image_url",
-                        "image_url": {"url": base64_url}
-                    })
-                except Exception as e:
-                    self.console.print(f"[red]Failed to convert image: {e}[/red]")
+            for result in await self._download_images(images):
+                if isinstance(result, Exception):
+                    self.console.print(f"[red]Failed to convert image: {result}[/red]")
                     continue
+                image_data, content_type = result
+                # Memory keeps a handle; the bytes live in the attachment store
+                memory_content.append({
+                    "type": "image_ref",
+                    "image_ref": memory.attachments.put(image_data, content_type)
+                })
+            indicator_content = [{"type": "text", "text": content}]
         else:
             memory_content = f"[{username}]: {content}"
+            indicator_content = content
         
-        self.memory.add_message("user", memory_content)
-        
-        if images:
-            llm_content = []
-            if content:
-                llm_content.append({"type": "text", "text": content})
-            else:
-                llm_content.append({"type": "text", "text": ""})
-            if isinstance(memory_content, list):
-                for item in memory_content:
-                    if item.get("type") == "image_url":
-                        llm_content.append(item)
-        else:
-            llm_content = content
-        
-        pending_messages, _ = await self._get_pending_messages()
-        
-        llm_messages = self._build_llm_context(llm_content, username, pending_messages)
-        
-        async with message.channel.typing():
-            if images:
-                user_msg = llm_content
-            else:
-                user_msg = f"[System]: Now responding to {username}'s message: \"{content}\""
-            
-            response, usage = await self.llm_service.get_response(
-                user_msg,
-                llm_messages
-            )
+        return memory_content, indicator_content
+    
+    async def process_messages(self, messages: List[discord.Message]):
+        """Answer one or more queued messages of a channel with a single reply"""
+        state = self._channel(messages[-1].channel.id)
+        memory = state.memory
+        supersede_after = self.character.discord_settings.get("supersede_after")
+        # A busy channel could otherwise cancel every generation and never get a reply
+        max_supersedes = self.character.discord_settings.get("max_supersedes", 1)
+        supersedes = 0
+        
+        for queued in messages:
+            indicator_content = await self._store_user_message(memory, queued)
+        if not await self._passes_gate(state, messages):
+            self.console.print(f"[dim]Gate skipped {len(messages)} message(s)[/dim]")
+            return
+        if len(messages) > 1:
+            self._record_coalesced(memory, len(messages))
         
+        async with self.sender.typing(messages[-1].channel):
+            while True:
+                message = messages[-1]
+                username = message.author.name
+                pending_messages = self._get_pending_messages(state)
+                llm_messages = self._build_llm_context(memory, indicator_content, username, pending_messages)
+                # System prompt and memory repeat next turn; pending and the indicator do not
+                stable_prefix = len(llm_messages) - len(pending_messages) - 1
+                if len(messages) > 1:
+                    usernames = ", ".join(dict.fromkeys(queued.author.name for queued in messages))
+                    llm_messages[-1]["content"] = (
+                        f"[System]: Now responding to the last {len(messages)} messages from {usernames}"
+                    )
+                
+                posted = asyncio.Event()
+                generation = asyncio.create_task(
+                    self._generate(message, memory, llm_messages, posted, stable_prefix)
+                )
+                if not supersede_after or supersedes >= max_supersedes:
+                    result = await generation
+                    break
+                result = await self._unless_superseded(state, generation, posted, supersede_after)
+                if result is not None:
+                    break
+                supersedes += 1
+                
+                # Regenerate with the newer messages folded into this turn
+                newer = []
+                while not state.queue.empty():
+                    newer.append(state.queue.get_nowait())
+                for queued in newer:
+                    indicator_content = await self._store_user_message(memory, queued)
+                    state.queue.task_done()
+                messages = messages + newer
+        
+        response, usage, replied = result
         bot_name = self.bot.user.name if self.bot.user else "assistant"
         
         # Check if bot chose not to respond
         if response.strip() == "[NO_RESPONSE]":
-            self.memory.add_message("assistant", f"[{bot_name}]: [NO_RESPONSE]")
+            memory.add_message("assistant", f"[{bot_name}]: [NO_RESPONSE]")
             if usage:
-                self.memory.add_usage(usage)
+                memory.add_usage(usage)
             self.console.print(f"[dim]{bot_name} chose not to respond to {username}[/dim]")
             return
         
         # Normal response
-        self.memory.add_message("assistant", f"[{bot_name}]: {response}")
+        memory.add_message("assistant", f"[{bot_name}]: {response}")
         if usage:
-            self.memory.add_usage(usage)
+            memory.add_usage(usage)
         
-        await message.reply(response)
+        if not replied:
+            await self.sender.reply(message, response)
         
-        if usage and usage.get('cost') is not None:
+        if usage:
+            cost = f"Cost: ${usage['cost']:.6f} | " if usage.get('cost') is not None else ""
             self.console.print(
                 f"[dim]Discord response to {username} - "
-                f"Cost: ${usage['cost']:.6f} | "
+                f"{cost}"
                 f"Tokens: {usage.get('total_tokens', 0)}[/dim]"
             )
     
-    async def process_message_queue(self):
-        """Process messages from the queue sequentially"""
+    async def _generate(self, message: discord.Message, memory: Memory, llm_messages: List[Dict],
+                        posted: asyncio.Event, stable_prefix: int = 0) -> tuple[str, dict, bool]:
+        """Run one completion; returns the reply, its usage and whether it was already posted"""
+        # Images reach the model through the memory copy of this message
+        user_msg = llm_messages[-1]["content"]
+        
+        if self.character.settings.get("stream"):
+            stream = self.llm_service.stream_response(
+                user_msg,
+                llm_messages,
+                on_usage=memory.add_usage,
+                stable_prefix=stable_prefix
+            )
+            try:
+                replied = await self._stream_reply(message, stream, posted)
+            except asyncio.CancelledError:
+                self.llm_service.metrics.incr("superseded_tokens_wasted", count_tokens(stream.text))
+                raise
+            return stream.text, stream.usage, replied
+        
+        response, usage = await self.llm_service.get_response(
+            user_msg,
+            llm_messages,
+            on_usage=memory.add_usage,
+            stable_prefix=stable_prefix
+        )
+        return response, usage, False
+    
+    async def _unless_superseded(self, state: ChannelState, generation: asyncio.Task,
+                                 posted: asyncio.Event, newer_count: int) -> Optional[tuple]:
+        """Await the generation, or cancel it if newer_count messages arrive before it is posted.
+        
+        Returns None when the generation was cancelled.
+        """
+        waiter = asyncio.create_task(state.queue.wait_for_size(len(state.queue) + newer_count))
+        try:
+            done, _ = await asyncio.wait({generation, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            generation.cancel()
+            raise
+        finally:
+            waiter.cancel()
+        if generation in done or posted.is_set():
+            return await generation
+        
+        generation.cancel()
+        await asyncio.gather(generation, return_exceptions=True)
+        self._record_superseded(state.memory)
+        return None
+    
+    def _record_superseded(self, memory: Memory):
+        """Count the prompt a cancelled call wasted and the completion it did not run to the end"""
+        metrics = self.llm_service.metrics
+        metrics.incr("superseded_generations")
+        metrics.incr("superseded_tokens_wasted", memory.get_context_tokens())
+        typical_reply = metrics.percentile("completion_tokens", 50)
+        if typical_reply:
+            metrics.incr("superseded_tokens_saved", typical_reply)
+        self.console.print("[dim]Newer messages arrived, regenerating[/dim]")
+    
+    async def _stream_reply(self, message: discord.Message, stream,
+                            posted: Optional[asyncio.Event] = None) -> bool:
+        """Post a reply as it streams in, editing it on a rate-limited cadence.
+        
+        Returns False if nothing was sent, e.g. for [NO_RESPONSE].
+        """
+        interval = self.character.discord_settings.get("stream_edit_interval", 1.0)
+        loop = asyncio.get_running_loop()
+        sent: List[discord.Message] = []
+        last_edit = 0.0
+        
+        async for _ in stream:
+            text = stream.text.strip()
+            if "[NO_RESPONSE]".startswith(text):
+                continue  # could still turn out to be [NO_RESPONSE]
+            if sent and loop.time() - last_edit < interval:
+                continue
+            # Set before the first chunk is queued: a supersede cancelling the
+            # generation then could leave that chunk posted and never edited
+            if posted is not None:
+                posted.set()
+            await self._sync_reply_chunks(message, sent, text)
+            last_edit = loop.time()
+        
+        if sent:
+            await self._sync_reply_chunks(message, sent, stream.text.strip())
+        return bool(sent)
+    
+    async def _sync_reply_chunks(self, message: discord.Message, sent: List[discord.Message], text: str):
+        """Bring the sent reply messages in line with the text so far"""
+        for i, chunk in enumerate(split_message(text)):
+            if i < len(sent):
+                if sent[i].content != chunk:
+                    sent[i] = await self.sender.edit(sent[i], chunk)
+            elif not sent:
+                sent.extend(await self.sender.reply(message, chunk))
+            else:
+                sent.extend(await self.sender.send(message.channel, chunk))
+    
+    async def process_channel_queue(self, state: ChannelState):
+        """Process one channel's messages in order; channels run side by side"""
+        # None answers every message on its own; 0 merges whatever queued up
+        # during the previous reply; above 0 also waits for a burst to settle
+        window = self.character.discord_settings.get("coalesce_window")
         while True:
+            batch = [await state.queue.get()]
             try:
-                message = await self.message_queue.get()
-                await self.process_single_message(message)
+                if window is not None:
+                    batch += await self._collect_burst(state, window)
+                await self.process_messages(batch)
             except Exception as e:
                 self.console.print(f"[red]Error processing message: {e}[/red]")
+            finally:
+                for _ in batch:
+                    state.queue.task_done()
+    
+    async def _collect_burst(self, state: ChannelState, window: float) -> List[discord.Message]:
+        """Take queued messages until the channel is quiet for window seconds"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.character.discord_settings.get("coalesce_max_wait", 5.0)
+        burst = []
+        while True:
+            while not state.queue.empty():
+                burst.append(state.queue.get_nowait())
+            timeout = min(window, deadline - loop.time())
+            if timeout <= 0:
+                return burst
+            try:
+                burst.append(await asyncio.wait_for(state.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                return burst
+    
+    def _record_coalesced(self, memory: Memory, count: int):
+        """Count the completions a merged burst saved and the prompt they would have re-sent"""
+        metrics = self.llm_service.metrics
+        metrics.incr("coalesced_calls_saved", count - 1)
+        metrics.incr("coalesced_tokens_saved", (count - 1) * memory.get_context_tokens())
+        self.console.print(f"[dim]Merged {count} messages into one reply[/dim]")
     
     # Command implementations
     async def _cmd_clear_memory(self, ctx):
-        self.memory.clear()
+        self._channel(ctx.channel.id).memory.clear()
         await ctx.send("✅ Memory cleared!")
     
     async def _cmd_show_stats(self, ctx):
-        stats = self.memory.get_stats()
+        stats = self._channel(ctx.channel.id).memory.get_stats()
         embed = discord.Embed(title="Session Statistics", color=0x00ff00)
         embed.add_field(name="Messages", value=str(stats["message_count"]), inline=True)
         embed.add_field(name="Total Cost", value=f"${stats['total_cost']:.6f}", inline=True)
         embed.add_field(name="Total Tokens", value=str(stats["total_tokens"]), inline=True)
         embed.add_field(name="Prompt Tokens", value=str(stats["prompt_tokens"]), inline=True)
+        embed.add_field(name="Cached Prompt Tokens", value=str(stats["cached_tokens"]), inline=True)
         embed.add_field(name="Completion Tokens", value=str(stats["completion_tokens"]), inline=True)
         embed.add_field(name="Context Usage", value=stats["context_usage"], inline=True)
+        embed.add_field(name="Context %", value=f"{stats['context_percentage']:.1f}%", inline=True)
+        if stats["summaries_made"]:
+            embed.add_field(name="Summaries", value=str(stats["summaries_made"]), inline=True)
+            embed.add_field(name="Tokens Saved / Turn", value=str(stats["tokens_saved_per_turn"]), inline=True)
+        llm_stats = self.llm_service.metrics.snapshot()
+        if llm_stats.get("coalesced_calls_saved"):
+            embed.add_field(
+                name="Coalesced",
+                value=(
+                    f"{llm_stats['coalesced_calls_saved']:.0f} calls / "
+                    f"~{llm_stats['coalesced_tokens_saved']:.0f} prompt tokens saved"
+                ),
+                inline=True
+            )
+        if llm_stats.get("superseded_generations"):
+            embed.add_field(
+                name="Superseded",
+                value=(
+                    f"{llm_stats['superseded_generations']:.0f} replies / "
+                    f"~{llm_stats.get('superseded_tokens_wasted', 0):.0f} tokens wasted, "
+                    f"~{llm_stats.get('superseded_tokens_saved', 0):.0f} saved"
+                ),
+                inline=True
+            )
+        if llm_stats.get("gate_skipped") or llm_stats.get("gate_passed"):
+            classifier_errors = sum(state.gate.classifier_errors for state in self.channels.values() if state.gate)
+            embed.add_field(
+                name="Gate",
+                value=(
+                    f"{llm_stats.get('gate_skipped', 0):.0f} skipped / "
+                    f"{llm_stats.get('gate_passed', 0):.0f} passed"
+                    + (f" / {classifier_errors} classifier errors" if classifier_errors else "")
+                ),
+                inline=True
+            )
+        if llm_stats.get("ttft_ms_p50") is not None:
+            embed.add_field(
+                name="Time to First Token",
+                value=f"p50 {llm_stats['ttft_ms_p50']:.0f}ms / p95 {llm_stats['ttft_ms_p95']:.0f}ms",
+                inline=True
+            )
+        if len(self.llm_service.models) > 1:
+            for model, description in self.llm_service.describe_model_stats().items():
+                embed.add_field(name=model, value=description, inline=True)
+        reliability = self.llm_service.reliability_summary()
+        if reliability:
+            embed.add_field(name="Provider", value=reliability, inline=False)
         await ctx.send(embed=embed)
     
     async def _cmd_show_system(self, ctx):
@@ -318,7 +668,7 @@ Be natural. Be human. Don't explain your message reading process."""
     
     async def _cmd_show_history(self, ctx):
         enhanced_prompt = self._build_enhanced_system_prompt()
-        messages = self.memory.get_messages()
+        messages = self._channel(ctx.channel.id).memory.get_messages()
         
         full_messages = [
             {"role": "system", "content": enhanced_prompt},
@@ -376,44 +726,121 @@ Be natural. Be human. Don't explain your message reading process."""
         embed.add_field(name="Max Tokens", value=str(self.character.settings.get('max_tokens', 'N/A')), inline=True)
         embed.add_field(name="Context Window", value=str(self.character.settings.get('context_window', 'N/A')), inline=True)
         embed.add_field(name="Platform", value=self.character.platform, inline=True)
-        if self.character.discord_channel_id:
-            embed.add_field(name="Channel ID", value=self.character.discord_channel_id, inline=True)
+        if self.all_channels:
+            embed.add_field(name="Channels", value="All", inline=True)
+        elif self.channel_ids:
+            embed.add_field(name="Channel IDs", value=", ".join(sorted(self.channel_ids)), inline=True)
         await ctx.send(embed=embed)
     
     async def _cmd_resume(self, ctx, count: int):
-        self.memory.clear()
-        
-        messages_added = 0
+        """Rebuild the channel memory from its newest messages, stopping once the memory is full"""
+        memory = self._channel(ctx.channel.id).memory
+        memory.clear()
+        max_messages, max_tokens = memory.capacity()
+        settings = self.character.discord_settings
+        downloads = asyncio.Semaphore(settings.get("resume_image_concurrency", 4))
+        progress = await ctx.send(f"⏳ Reading up to {count} messages...")
+        
+        # History pages newest first, so only what the memory can hold is kept
+        kept = []  # (role, content or image download task), newest first
+        kept_tokens = 0
+        scanned = 0
         messages_skipped = 0
-        conversation_messages = []
-        
-        async for message in ctx.channel.history(limit=count):
-            if message.content.startswith('/'):
-                messages_skipped += 1
-                continue
-            if message.embeds and message.author == self.bot.user:
-                messages_skipped += 1
-                continue
-            
-            conversation_messages.append(message)
-        
-        conversation_messages.reverse()
-        
-        for message in conversation_messages:
-            if message.author == self.bot.user:
-                bot_name = message.author.name
-                self.memory.add_message("assistant", f"[{bot_name}]: {message.content}")
-            else:
-                username = message.author.name
-                content = self._clean_message_content(message)
-                self.memory.add_message("user", f"[{username}]: {content}")
-            messages_added += 1
-        
-        total_processed = messages_added + messages_skipped
-        await ctx.send(f"✅ Restored {messages_added} messages to memory (skipped {messages_skipped} commands/embeds, processed {total_processed}/{count} total)")
+        memory_full = False
+        try:
+            async for message in ctx.channel.history(limit=count):
+                scanned += 1
+                if scanned % self.RESUME_PROGRESS_EVERY == 0:
+                    await self.sender.edit(progress, f"⏳ Read {scanned}/{count} messages...")
+                if message.content.startswith('/'):
+                    messages_skipped += 1
+                    continue
+                if message.embeds and message.author == self.bot.user:
+                    messages_skipped += 1
+                    continue
+                
+                if message.author == self.bot.user:
+                    role, content = "assistant", f"[{message.author.name}]: {message.content}"
+                else:
+                    role, content = "user", f"[{message.author.name}]: {self._clean_message_content(message)}"
+                tokens = count_message_tokens({"role": role, "content": content})
+                if (max_messages is not None and len(kept) >= max_messages) or \
+                        (max_tokens is not None and kept and kept_tokens + tokens > max_tokens):
+                    memory_full = True
+                    break
+                kept_tokens += tokens
+                if role == "user" and settings.get("resume_images") and self._get_image_attachments(message):
+                    content = asyncio.create_task(self._resume_user_content(memory, message, downloads))
+                kept.append((role, content))
+        except BaseException:
+            for _, content in kept:
+                if isinstance(content, asyncio.Task):
+                    content.cancel()
+            raise
+        
+        for role, content in reversed(kept):
+            if isinstance(content, asyncio.Task):
+                content = await content
+            memory.add_message(role, content)
+        
+        summary = (
+            f"✅ Restored {len(kept)} messages to memory "
+            f"(skipped {messages_skipped} commands/embeds, processed {scanned}/{count} total)"
+        )
+        if memory_full:
+            summary += " - stopped early, memory is full"
+        await self.sender.edit(progress, summary)
+    
+    async def _resume_user_content(self, memory: Memory, message: discord.Message,
+                                   downloads: asyncio.Semaphore):
+        async with downloads:
+            content, _ = await self._user_content(memory, message)
+        return content
+    
+    async def start(self, token: str):
+        """Run the bot on the current event loop until it is closed"""
+        # Process-wide in discord.py; meant for a local stub of the Discord API
+        settings = self.character.discord_settings
+        if settings.get("api_base"):
+            discord.http.Route.BASE = settings["api_base"]
+        if settings.get("gateway_url"):
+            discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(settings["gateway_url"])
+        try:
+            async with self.bot:
+                await self.bot.start(token)
+        finally:
+            await self.aclose()
+    
+    async def shutdown(self, timeout: float = 30.0):
+        """Stop taking messages, let the queued ones be answered, then log out"""
+        self.accepting = False
+        joins = asyncio.gather(*(state.queue.join() for state in self.channels.values()))
+        try:
+            await asyncio.wait_for(joins, timeout)
+        except asyncio.TimeoutError:
+            self.console.print("[yellow]Shutdown timed out with messages still queued[/yellow]")
+        await self.bot.close()
+    
+    async def aclose(self):
+        workers = [state.worker for state in self.channels.values() if state.worker]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await self.sender.aclose()
+        if self.http_session is not None:
+            await self.http_session.close()
+        if self.image_preprocessor:
+            self.image_preprocessor.close()
+        await self.llm_service.aclose()
+        for state in self.channels.values():
+            state.memory.close()
     
     def run(self, token: str):
-        self.bot.run(token)
+        discord.utils.setup_logging()
+        try:
+            asyncio.run(self.start(token))
+        except KeyboardInterrupt:
+            pass
     
     def send_message(self, message: str):
         """Send message stub - not used in Discord platform"""
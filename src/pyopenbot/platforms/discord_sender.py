@@ -0,0 +1,188 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+import asyncio
+import time
+import discord
+
+
+DISCORD_MESSAGE_LIMIT = 2000
+
+# Natural places to cut a long reply, best first
+SPLIT_BOUNDARIES = ("\n\n", "\n", ". ", " ")
+
+
+def split_message(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> List[str]:
+    """Split text into Discord-sized chunks at paragraph, line, sentence or word boundaries"""
+    chunks = []
+    while len(text) > limit:
+        cut = 0
+        for boundary in SPLIT_BOUNDARIES:
+            index = text.rfind(boundary, 0, limit)
+            if index > 0:
+                cut = index + (1 if boundary == ". " else 0)  # keep the full stop
+                break
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    chunks.append(text)
+    return chunks
+
+
+class TokenBucket:
+    """Allows burst calls at once, refilling at rate calls per second"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class _Outgoing:
+    kind: str  # "send", "reply" or "edit"
+    target: Any  # channel for send, message for reply and edit
+    text: str
+    future: asyncio.Future
+
+
+@dataclass
+class _Outbox:
+    bucket: TokenBucket
+    pending: Deque[_Outgoing] = field(default_factory=deque)
+    worker: Optional[asyncio.Task] = None
+    working: int = 0  # open typing() blocks
+    typing_task: Optional[asyncio.Task] = None
+
+
+class DiscordSender:
+    """Outbound side of the Discord platform.
+
+    Every channel has its own outbox drained in order through a token
+    bucket, so many channels replying at once cannot trip Discord's
+    per-channel limits. Long texts are split at natural boundaries, plain
+    sends queued back to back are merged into one message when they fit,
+    and of several queued edits to one message only the newest is made.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 5, coalesce: bool = True,
+                 typing_interval: float = 8.0, limit: int = DISCORD_MESSAGE_LIMIT):
+        self.rate = rate
+        self.burst = burst
+        self.coalesce = coalesce
+        self.typing_interval = typing_interval  # Discord shows typing for about 10s
+        self.limit = limit
+        self._outboxes: Dict[Any, _Outbox] = {}
+
+    def _outbox(self, channel) -> _Outbox:
+        key = getattr(channel, "id", channel)
+        if key not in self._outboxes:
+            self._outboxes[key] = _Outbox(bucket=TokenBucket(self.rate, self.burst))
+        return self._outboxes[key]
+
+    def _enqueue(self, channel, kind: str, target, text: str) -> asyncio.Future:
+        outbox = self._outbox(channel)
+        future = asyncio.get_running_loop().create_future()
+        outbox.pending.append(_Outgoing(kind, target, text, future))
+        if outbox.worker is None or outbox.worker.done():
+            outbox.worker = asyncio.create_task(self._drain(outbox))
+        return future
+
+    async def send(self, channel, text: str) -> List[discord.Message]:
+        futures = [self._enqueue(channel, "send", channel, chunk) for chunk in split_message(text, self.limit)]
+        return list(dict.fromkeys([await future for future in futures]))
+
+    async def reply(self, message: discord.Message, text: str) -> List[discord.Message]:
+        first, *rest = split_message(text, self.limit)
+        futures = [self._enqueue(message.channel, "reply", message, first)]
+        futures += [self._enqueue(message.channel, "send", message.channel, chunk) for chunk in rest]
+        return list(dict.fromkeys([await future for future in futures]))
+
+    async def edit(self, message: discord.Message, text: str) -> discord.Message:
+        return await self._enqueue(message.channel, "edit", message, text)
+
+    async def _drain(self, outbox: _Outbox):
+        while outbox.pending:
+            item = outbox.pending.popleft()
+            if item.future.cancelled():
+                continue  # the caller gave up on it
+            merged = [item]
+            if item.kind == "edit" and any(
+                queued.kind == "edit" and queued.target is item.target for queued in outbox.pending
+            ):
+                item.future.set_result(item.target)  # a newer edit supersedes this one
+                continue
+            if item.kind == "send" and self.coalesce:
+                text = item.text
+                while (outbox.pending and outbox.pending[0].kind == "send"
+                       and len(text) + 1 + len(outbox.pending[0].text) <= self.limit):
+                    queued = outbox.pending.popleft()
+                    if queued.future.cancelled():
+                        continue
+                    text += "\n" + queued.text
+                    merged.append(queued)
+
+            await outbox.bucket.acquire()
+            # Callers may also give up while the send waits for the bucket
+            merged = [queued for queued in merged if not queued.future.cancelled()]
+            if not merged:
+                continue
+            if item.kind == "send":
+                item = _Outgoing(item.kind, item.target, "\n".join(queued.text for queued in merged), item.future)
+            try:
+                if item.kind == "send":
+                    result = await item.target.send(item.text)
+                elif item.kind == "reply":
+                    result = await item.target.reply(item.text)
+                else:
+                    result = await item.target.edit(content=item.text)
+            except Exception as e:
+                for queued in merged:
+                    if not queued.future.done():
+                        queued.future.set_exception(e)
+                continue
+            for queued in merged:
+                if not queued.future.done():
+                    queued.future.set_result(result)
+
+    @asynccontextmanager
+    async def typing(self, channel) -> AsyncIterator[None]:
+        """Show the typing indicator in channel for as long as any block is open"""
+        outbox = self._outbox(channel)
+        outbox.working += 1
+        if outbox.typing_task is None or outbox.typing_task.done():
+            outbox.typing_task = asyncio.create_task(self._keep_typing(channel, outbox))
+        try:
+            yield
+        finally:
+            outbox.working -= 1
+            if outbox.working == 0 and outbox.typing_task:
+                outbox.typing_task.cancel()
+
+    async def _keep_typing(self, channel, outbox: _Outbox):
+        while outbox.working:
+            try:
+                await channel.typing()
+            except discord.HTTPException:
+                pass  # the indicator is cosmetic
+            await asyncio.sleep(self.typing_interval)
+
+    async def aclose(self):
+        tasks = [task for outbox in self._outboxes.values()
+                 for task in (outbox.worker, outbox.typing_task) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
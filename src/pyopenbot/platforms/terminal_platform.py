@@ -0,0 +1,270 @@
+from pyopenbot.platforms.base_platform import BasePlatform
+from pyopenbot.llm_service import LLMService
+from pyopenbot.memory import Memory
+from rich.console import Console
+from rich.live import Live
+from rich.panel import Panel
+from rich.table import Table
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import signal
+import sys
+import threading
+
+
+class TerminalPlatform(BasePlatform):
+    """Interactive terminal chat running on an asyncio loop.
+    
+    Input is read off the loop, so usage lookups and other background
+    work keep going while the user types, and Ctrl+C cancels the reply
+    in flight instead of ending the session.
+    """
+    
+    def __init__(self, character, llm_service: LLMService, memory: Memory,
+                 read_line: Optional[Callable[[], Awaitable[str]]] = None):
+        self.character = character
+        self.llm_service = llm_service
+        self.memory = memory
+        self.read_line = read_line or self._read_stdin  # returns "" at end of input
+        self.console = Console()
+        self.generation: Optional[asyncio.Task] = None
+    
+    def _read_stdin(self) -> asyncio.Future:
+        """Read one line on a daemon thread, so a pending read never holds up exit"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def read():
+            line = sys.stdin.readline()
+            try:
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(line))
+            except RuntimeError:
+                pass  # the loop closed while waiting for input
+        
+        threading.Thread(target=read, daemon=True).start()
+        return future
+    
+    def _interrupt(self):
+        if self.generation and not self.generation.done():
+            self.generation.cancel()
+        else:
+            self.console.print("\n[yellow]Use /quit to exit[/yellow]")
+    
+    async def start(self):
+        """Chat until /quit or the end of input"""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._interrupt)
+            handles_interrupt = True
+        except (NotImplementedError, RuntimeError):
+            handles_interrupt = False  # e.g. Windows, or not the main thread
+        
+        try:
+            while True:
+                self.console.print("\n[bold cyan]You[/bold cyan]: ", end="")
+                line = await self.read_line()
+                if not line:
+                    break
+                user_input = line.rstrip("\n")
+                
+                if user_input.startswith("/"):
+                    if not self.handle_command(user_input):
+                        break
+                    continue
+                
+                self.generation = asyncio.create_task(self.respond(user_input))
+                try:
+                    await self.generation
+                except asyncio.CancelledError:
+                    if asyncio.current_task().cancelling():
+                        raise
+                    self.console.print("[yellow]Reply cancelled[/yellow]")
+                finally:
+                    self.generation = None
+        finally:
+            if handles_interrupt:
+                loop.remove_signal_handler(signal.SIGINT)
+            await self.aclose()
+    
+    async def respond(self, user_input: str):
+        """Answer one user turn and add both sides to memory"""
+        self.memory.add_message("user", user_input)
+        messages = self._build_llm_context()
+        # System prompt and earlier turns repeat next turn; only the new message does not
+        stable_prefix = len(messages) - 1
+        
+        try:
+            if self.character.settings.get("stream"):
+                self.console.print()
+                response, usage = await self._stream_to_console(user_input, messages, stable_prefix)
+            else:
+                with self.console.status("[dim]Thinking...[/dim]"):
+                    response, usage = await self.llm_service.get_response(
+                        user_input,
+                        messages,
+                        on_usage=self.memory.add_usage,
+                        stable_prefix=stable_prefix
+                    )
+                self.console.print(self._response_panel(response))
+        except Exception as e:
+            self._print_error(e)
+            return
+        
+        self.memory.add_message("assistant", response)
+        if usage:
+            self.memory.add_usage(usage)
+        
+        # Without an inline cost, the lookup adds it to memory in the background
+        if usage and usage.get('cost') is not None:
+            self.console.print(f"[dim]Cost: ${usage['cost']:.6f} | Tokens: {usage.get('total_tokens', 0)}[/dim]")
+        elif usage:
+            self.console.print(f"[dim]Tokens: {usage.get('total_tokens', 0)}[/dim]")
+    
+    def _build_llm_context(self) -> List[Dict]:
+        """The system prompt followed by memory, as counted in Memory.system_tokens"""
+        return [
+            {"role": "system", "content": self.character.character_card},
+            *self.memory.get_messages()
+        ]
+    
+    async def _stream_to_console(self, user_input: str, messages, stable_prefix: int) -> tuple[str, dict]:
+        """Render the reply live in the terminal as deltas arrive"""
+        stream = self.llm_service.stream_response(
+            user_input,
+            messages,
+            on_usage=self.memory.add_usage,
+            stable_prefix=stable_prefix
+        )
+        with Live(self._response_panel("[dim]Thinking...[/dim]"),
+                  console=self.console, refresh_per_second=12) as live:
+            async for _ in stream:
+                live.update(self._response_panel(stream.text))
+        return stream.text, stream.usage
+    
+    def _response_panel(self, text: str) -> Panel:
+        return Panel(
+            text,
+            title=f"[bold green]{self.character.character_name}[/bold green]",
+            border_style="green"
+        )
+    
+    def _print_error(self, error: Exception):
+        error_msg = str(error)
+        if "no providers" in error_msg.lower():
+            self.console.print("[red]Error: No providers available that comply with privacy requirements[/red]")
+        elif "api" in error_msg.lower() and "key" in error_msg.lower():
+            self.console.print("[red]Error: Invalid API key[/red]")
+        else:
+            self.console.print(f"[red]Error: {error_msg}[/red]")
+    
+    async def aclose(self):
+        if self.generation and not self.generation.done():
+            self.generation.cancel()
+            await asyncio.gather(self.generation, return_exceptions=True)
+        await self.llm_service.aclose()
+        self.memory.close()
+    
+    def run(self):
+        try:
+            asyncio.run(self.start())
+        except KeyboardInterrupt:
+            pass  # Ctrl+C where no handler could be installed
+    
+    def send_message(self, message: str):
+        self.console.print(message)
+    
+    def handle_command(self, command: str) -> bool:
+        """Run a slash command; returns False to end the conversation"""
+        cmd = command.lower().strip()
+        
+        if cmd in ["/quit", "/exit"]:
+            self.console.print("[yellow]Goodbye![/yellow]")
+            return False
+        
+        elif cmd == "/clear":
+            self.memory.clear()
+            self.console.print("[green]Conversation cleared[/green]")
+        
+        elif cmd == "/system":
+            self.console.print(Panel(
+                self.character.character_card,
+                title="[bold]System Prompt[/bold]",
+                border_style="blue"
+            ))
+        
+        elif cmd == "/stats":
+            stats = self.memory.get_stats()
+            table = Table(title="Session Statistics")
+            table.add_column("Metric", style="cyan")
+            table.add_column("Value", style="green")
+            
+            table.add_row("Messages", str(stats["message_count"]))
+            table.add_row("Total Cost", f"${stats['total_cost']:.6f}")
+            table.add_row("Prompt Tokens", str(stats["prompt_tokens"]))
+            table.add_row("Cached Prompt Tokens", str(stats["cached_tokens"]))
+            table.add_row("Completion Tokens", str(stats["completion_tokens"]))
+            table.add_row("Total Tokens", str(stats["total_tokens"]))
+            table.add_row("Context Usage", stats["context_usage"])
+            table.add_row("Context %", f"{stats['context_percentage']:.1f}%")
+            if stats["summaries_made"]:
+                table.add_row("Summaries", str(stats["summaries_made"]))
+                table.add_row("Tokens Saved / Turn", str(stats["tokens_saved_per_turn"]))
+            
+            llm_stats = self.llm_service.metrics.snapshot()
+            if llm_stats.get("ttft_ms_p50") is not None:
+                table.add_row(
+                    "Time to First Token",
+                    f"p50 {llm_stats['ttft_ms_p50']:.0f}ms / p95 {llm_stats['ttft_ms_p95']:.0f}ms"
+                )
+            if len(self.llm_service.models) > 1:
+                for model, description in self.llm_service.describe_model_stats().items():
+                    table.add_row(model, description)
+            reliability = self.llm_service.reliability_summary()
+            if reliability:
+                table.add_row("Provider", reliability)
+            
+            self.console.print(table)
+        
+        elif cmd == "/history":
+            self.console.print(Panel("[bold]Conversation History (sent to model)[/bold]", title="History"))
+            for msg in self._build_llm_context():
+                role_color = "cyan" if msg['role'] == "user" else "green" if msg['role'] == "assistant" else "yellow"
+                self.console.print(f"[bold {role_color}]{msg['role'].upper()}:[/bold {role_color}]")
+                self.console.print(msg['content'])
+                self.console.print()
+        
+        elif cmd == "/config":
+            table = Table(title="Bot Configuration")
+            table.add_column("Setting", style="cyan")
+            table.add_column("Value", style="green")
+            
+            table.add_row("Character Name", self.character.character_name)
+            table.add_row("Provider", self.character.llm_provider)
+            table.add_row("Model", self.character.llm_model)
+            table.add_row("Memory Type", self.character.memory_type)
+            table.add_row("Temperature", str(self.character.settings.get('temperature', 'N/A')))
+            table.add_row("Top-p", str(self.character.settings.get('top_p', 'N/A')))
+            table.add_row("Max Tokens", str(self.character.settings.get('max_tokens', 'N/A')))
+            table.add_row("Context Window", str(self.character.settings.get('context_window', 'N/A')))
+            table.add_row("Platform", self.character.platform)
+            
+            self.console.print(table)
+        
+        elif cmd == "/help":
+            help_text = """
+[bold]Available Commands:[/bold]
+  /help    - Show this help message
+  /quit    - Exit the bot
+  /clear   - Clear conversation history
+  /system  - Show system prompt
+  /stats   - Show session statistics
+  /history - Show full conversation history sent to model
+  /config  - Show bot configuration
+  Ctrl+C   - Stop the reply being written
+            """
+            self.console.print(Panel(help_text.strip(), title="[bold]Help[/bold]"))
+        
+        else:
+            self.console.print(f"[red]Unknown command: {command}[/red]")
+        
+        return True
@@ -0,0 +1,125 @@
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from any_llm.exceptions import AnyLLMError, GatewayTimeoutError, ProviderError, RateLimitError, UpstreamProviderError
+import asyncio
+import random
+import time
+
+
+RETRYABLE_STATUS = {408, 409, 425, 429}
+
+# Without an HTTP status, only these mean a timeout or connection failure; other
+# errors without one (missing key, unsupported parameter, ...) will not go away
+TRANSIENT_ERRORS = (ProviderError, UpstreamProviderError, GatewayTimeoutError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit breaker is open"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection failures, rate limits and 5xx responses"""
+    if isinstance(error, (asyncio.TimeoutError, RateLimitError)):
+        return True
+    if isinstance(error, AnyLLMError):
+        status = error.status_code
+        if status is None:
+            return isinstance(error, TRANSIENT_ERRORS)
+        return status in RETRYABLE_STATUS or status >= 500
+    return False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After value (number or HTTP date), if the error carries one"""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Per-call timeout plus jittered exponential backoff between attempts"""
+    attempts: int = 3  # total tries, including the first
+    timeout: float = 60.0  # seconds per attempt; for streams, per chunk
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    max_retry_after: float = 60.0  # a longer Retry-After is not waited out
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "RetryPolicy":
+        return cls(
+            attempts=max(1, settings.get("retry_attempts", 3)),
+            timeout=settings.get("request_timeout", 60.0),
+            base_delay=settings.get("retry_base_delay", 0.5),
+            max_delay=settings.get("retry_max_delay", 20.0)
+        )
+
+    def delay(self, attempt: int, error: Optional[Exception] = None) -> Optional[float]:
+        """Seconds to wait before retry number attempt (1-based); None to give up"""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        # Full jitter keeps many clients from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+@dataclass
+class CircuitBreaker:
+    """Fails fast after repeated provider failures, then lets one trial call through.
+
+    closed: calls go through. open: calls raise CircuitOpenError until
+    reset_after seconds have passed. half_open: one trial call; success
+    closes the circuit, failure opens it again.
+    """
+    failure_threshold: int = 5
+    reset_after: float = 30.0
+    state: str = "closed"
+    failures: int = 0
+    _opened_at: float = field(default=0.0, repr=False)
+    _trial_running: bool = field(default=False, repr=False)
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "CircuitBreaker":
+        return cls(
+            failure_threshold=settings.get("circuit_failures", 5),
+            reset_after=settings.get("circuit_reset", 30.0)
+        )
+
+    def is_open(self) -> bool:
+        """Open and still rejecting calls; past reset_after the next call is a trial"""
+        return self.state == "open" and time.monotonic() - self._opened_at < self.reset_after
+
+    def before_call(self):
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_after:
+                raise CircuitOpenError("Provider circuit is open after repeated failures")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_running:
+                raise CircuitOpenError("Provider circuit is half-open, waiting for the trial call")
+            self._trial_running = True
+
+    def abandon(self):
+        """A call was cancelled before it could succeed or fail"""
+        self._trial_running = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_running = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
@@ -0,0 +1,125 @@
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import json
+import os
+import re
+import time
+
+
+DEFAULT_STORE_DIR = "~/.pyopenbot/conversations"
+
+
+class ConversationStore:
+    """Append-only JSONL log of one conversation, keyed by character and channel.
+
+    Every record is written to the OS right away so a crash of the bot
+    loses nothing; fsync is batched to every flush_every records or
+    flush_interval seconds. Usage totals live in a small sidecar file
+    that is replaced atomically.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, path: Path, flush_every: int = 20, flush_interval: float = 1.0):
+        self.path = path
+        self.usage_path = path.with_suffix(".usage.json")
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._usage: Optional[Dict] = None  # pending sidecar contents
+
+    @classmethod
+    def for_conversation(cls, directory: str, character_name: str, channel: str, **kwargs) -> "ConversationStore":
+        root = Path(directory).expanduser()
+        return cls(root / cls._slug(character_name) / f"{cls._slug(channel)}.jsonl", **kwargs)
+
+    @staticmethod
+    def _slug(name: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "default"
+
+    def append_message(self, message: Dict):
+        self._append({"type": "message", "role": message["role"], "content": message["content"]})
+
+    def append_clear(self):
+        self._append({"type": "clear"})
+
+    def save_usage(self, totals: Dict):
+        self._usage = totals
+        self._maybe_sync()
+
+    def _append(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        self._maybe_sync()
+
+    def _maybe_sync(self):
+        if (self._unsynced >= self.flush_every
+                or time.monotonic() - self._last_sync >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """fsync pending records and write the usage sidecar"""
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        if self._usage is not None:
+            tmp_path = self.usage_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._usage, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.usage_path)
+            self._usage = None
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def load_usage(self) -> Dict:
+        if not self.usage_path.exists():
+            return {}
+        with open(self.usage_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_tail(self, max_messages: int) -> List[Dict]:
+        """Return up to max_messages newest messages since the last clear, oldest first.
+
+        Reads the file backwards in blocks, so startup cost depends on
+        the tail size rather than the length of the whole log.
+        """
+        messages = []
+        for line in self._iter_lines_reversed():
+            if len(messages) >= max_messages:
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final write
+            if record.get("type") == "clear":
+                break
+            if record.get("type") == "message":
+                messages.append({"role": record["role"], "content": record["content"]})
+        messages.reverse()
+        return messages
+
+    def _iter_lines_reversed(self) -> Iterator[str]:
+        with open(self.path, "rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0:
+                size = min(self.BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b"\n")
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line:
+                        yield line.decode("utf-8")
+            if remainder:
+                yield remainder.decode("utf-8")
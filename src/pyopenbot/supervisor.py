@@ -0,0 +1,193 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from rich.console import Console
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+
+
+USAGE_FIELDS = ("cost", "prompt_tokens", "completion_tokens", "cached_tokens")
+
+
+class UsageLedger:
+    """Usage totals per character across all worker processes, optionally kept in a JSON file"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.totals: Dict[str, Dict[str, float]] = {}
+        if path is not None and path.exists():
+            self.totals = json.loads(path.read_text())
+
+    def add(self, character: str, usage: dict):
+        totals = self.totals.setdefault(character, {key: 0 for key in USAGE_FIELDS})
+        for key in USAGE_FIELDS:
+            totals[key] = totals.get(key, 0) + (usage.get(key) or 0)
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix(".tmp")
+        temp.write_text(json.dumps(self.totals, indent=2))
+        os.replace(temp, self.path)
+
+
+def run_worker(configs: List[str], usage_queue, max_concurrency: int, drain_timeout: float):
+    """Worker process: host a shard of the characters until SIGTERM, then drain and exit"""
+    from pyopenbot.character import Character
+    from pyopenbot.host import CharacterHost
+
+    characters = [Character.from_yaml(Path(config)) for config in configs]
+    host = CharacterHost(
+        characters,
+        max_concurrency,
+        usage_listener=lambda name, usage: usage_queue.put((name, usage))
+    )
+    asyncio.run(_serve(host, drain_timeout))
+
+
+async def _serve(host, drain_timeout: float):
+    loop = asyncio.get_running_loop()
+    shutdowns = set()
+
+    def shut_down():
+        if not shutdowns:
+            shutdowns.add(asyncio.create_task(host.shutdown(drain_timeout)))
+
+    host.build()
+    loop.add_signal_handler(signal.SIGTERM, shut_down)
+    # Ctrl+C reaches the whole process group; the supervisor decides what happens
+    loop.add_signal_handler(signal.SIGINT, lambda: None)
+    await host.start()
+
+
+@dataclass
+class _Worker:
+    index: int
+    configs: List[str]
+    process: Optional[Any] = None
+    started_at: float = 0.0
+    restart_delay: float = 0.0
+    restart_at: Optional[float] = None
+    restarts: int = 0
+
+
+@dataclass
+class Supervisor:
+    """Spreads characters over worker processes and keeps those workers running.
+
+    Each worker hosts its shard of the characters with a CharacterHost.
+    A worker that dies is started again after a backoff that doubles
+    while it keeps crashing soon after start. Usage recorded in any
+    worker is sent here and summed in one ledger. stop() sends SIGTERM,
+    on which workers stop taking messages, answer the queued ones and
+    log out.
+    """
+    configs: List[Path]
+    workers: int = 2
+    max_concurrency: int = 16  # per worker
+    ledger_path: Optional[Path] = None
+    drain_timeout: float = 30.0
+    restart_delay: float = 1.0
+    max_restart_delay: float = 60.0
+    stable_after: float = 60.0  # a worker that ran this long restarts without backoff
+    console: Console = field(default_factory=Console, repr=False)
+
+    def __post_init__(self):
+        self.ledger = UsageLedger(self.ledger_path)
+        shards = [self.configs[i::self.workers] for i in range(min(self.workers, len(self.configs)))]
+        self._workers = [_Worker(i, [str(config) for config in shard]) for i, shard in enumerate(shards)]
+        self._context = multiprocessing.get_context("spawn")
+        self._usage = self._context.Queue()
+        self._stopping = False
+
+    @property
+    def processes(self) -> List[Any]:
+        return [worker.process for worker in self._workers]
+
+    def start(self):
+        for worker in self._workers:
+            self._spawn(worker)
+
+    def _spawn(self, worker: _Worker):
+        worker.process = self._context.Process(
+            target=run_worker,
+            args=(worker.configs, self._usage, self.max_concurrency, self.drain_timeout),
+            name=f"pyopenbot-worker-{worker.index}",
+            daemon=False
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+
+    def poll(self, timeout: float = 0.5):
+        """Collect usage for up to timeout seconds, then restart workers that died"""
+        self._collect_usage(timeout)
+        now = time.monotonic()
+        for worker in self._workers:
+            if self._stopping or worker.process.is_alive():
+                continue
+            if worker.restart_at is None:
+                ran = now - worker.started_at
+                if ran >= self.stable_after:
+                    worker.restart_delay = 0.0
+                worker.restart_delay = min(
+                    self.max_restart_delay, worker.restart_delay * 2 or self.restart_delay
+                )
+                worker.restart_at = now + worker.restart_delay
+                self.console.print(
+                    f"[yellow]Worker {worker.index} exited with code {worker.process.exitcode}, "
+                    f"restarting in {worker.restart_delay:.1f}s[/yellow]"
+                )
+            elif now >= worker.restart_at:
+                worker.restarts += 1
+                self._spawn(worker)
+
+    def _collect_usage(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        received = False
+        while True:
+            try:
+                name, usage = self._usage.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            self.ledger.add(name, usage)
+            received = True
+        if received:
+            self.ledger.save()
+
+    def stop(self):
+        """Ask every worker to drain and exit; kill those that outlast the drain timeout"""
+        self._stopping = True
+        alive = [worker.process for worker in self._workers if worker.process.is_alive()]
+        for process in alive:
+            process.terminate()
+        deadline = time.monotonic() + self.drain_timeout + 10
+        while any(process.is_alive() for process in alive) and time.monotonic() < deadline:
+            self._collect_usage(0.2)
+        for process in alive:
+            if process.is_alive():
+                self.console.print(f"[red]{process.name} did not stop in time, killing it[/red]")
+                process.kill()
+            process.join()
+        self._collect_usage(0.2)
+        self.ledger.save()
+
+    def run(self):
+        """Supervise until SIGINT or SIGTERM, then shut the workers down gracefully"""
+        requested = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: requested.set())
+        self.start()
+        try:
+            while not requested.is_set():
+                self.poll()
+        finally:
+            self.console.print("[yellow]Shutting down workers...[/yellow]")
+            self.stop()
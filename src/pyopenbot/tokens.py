@@ -0,0 +1,28 @@
+from typing import Dict, List, Union
+
+
+CHARS_PER_TOKEN = 4  # rough average for English text across common tokenizers
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators added by the chat format
+IMAGE_TOKEN_ESTIMATE = 765  # a typical high-detail image
+
+
+def count_tokens(content: Union[str, List[Dict]]) -> int:
+    """Estimate the tokens content will use, without a tokenizer.
+
+    Cheap enough to call on every message; exact counts come back from
+    the provider in the usage block.
+    """
+    if isinstance(content, str):
+        return -(-len(content) // CHARS_PER_TOKEN)
+
+    tokens = 0
+    for item in content:
+        if item.get("type") == "text":
+            tokens += -(-len(item.get("text", "")) // CHARS_PER_TOKEN)
+        else:
+            tokens += IMAGE_TOKEN_ESTIMATE
+    return tokens
+
+
+def count_message_tokens(message: Dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+from aiohttp import web, WSMsgType
+
+
+BOT_USER = {"id": "1000", "username": "stubbot", "discriminator": "0", "avatar": None, "bot": True}
+
+
+def _json(data: dict) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), headers={"Content-Type": "application/json"})
+
+
+class StubDiscordServer:
+    """Just enough of the Discord REST API and gateway for a discord.py bot to log in, receive and reply"""
+
+    def __init__(self):
+        self.sent = []  # (channel id, content) posted by bots
+        self.identifies = 0
+        self.sockets = []
+        self.runner = None
+        self.port = None
+        self._sequence = 0
+        self._message_ids = 2000
+
+    @property
+    def api_base(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v10"
+
+    @property
+    def gateway_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/gateway"
+
+    @property
+    def settings(self) -> dict:
+        """Discord settings that point a character at this server"""
+        return {"api_base": self.api_base, "gateway_url": self.gateway_url}
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/api/v10/users/@me", self._me)
+        app.router.add_get("/api/v10/oauth2/applications/@me", self._application)
+        app.router.add_get("/api/v10/gateway/bot", self._gateway_bot)
+        app.router.add_get("/api/v10/gateway", self._gateway_bot)
+        app.router.add_post("/api/v10/channels/{channel_id}/messages", self._create_message)
+        app.router.add_post("/api/v10/channels/{channel_id}/typing", self._typing)
+        app.router.add_get("/gateway", self._gateway)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for socket in list(self.sockets):
+            await socket.close()
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def dispatch_message(self, channel_id: int, content: str, author: str = "user"):
+        """Send a MESSAGE_CREATE to every connected bot"""
+        self._message_ids += 1
+        data = {
+            "id": str(self._message_ids),
+            "channel_id": str(channel_id),
+            "author": {"id": "42", "username": author, "discriminator": "0", "avatar": None},
+            "content": content,
+            "timestamp": "2025-01-01T00:00:00+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+        }
+        for socket in list(self.sockets):
+            await self._send_event(socket, "MESSAGE_CREATE", data)
+
+    async def wait_for_sent(self, count: int, timeout: float = 20.0):
+        deadline = time.monotonic() + timeout
+        while len(self.sent) < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def _send_event(self, socket, event: str, data: dict):
+        self._sequence += 1
+        await socket.send_str(json.dumps({"op": 0, "t": event, "s": self._sequence, "d": data}))
+
+    async def _me(self, request: web.Request) -> web.Response:
+        return _json(BOT_USER)
+
+    async def _application(self, request: web.Request) -> web.Response:
+        return _json({
+            "id": BOT_USER["id"],
+            "name": BOT_USER["username"],
+            "icon": None,
+            "description": "",
+            "rpc_origins": [],
+            "bot_public": True,
+            "bot_require_code_grant": False,
+            "owner": {"id": "1", "username": "owner", "discriminator": "0", "avatar": None},
+            "summary": "",
+            "verify_key": "",
+            "flags": 0,
+        })
+
+    async def _gateway_bot(self, request: web.Request) -> web.Response:
+        return _json({
+            "url": self.gateway_url,
+            "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def _create_message(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        channel_id = request.match_info["channel_id"]
+        self.sent.append((channel_id, body.get("content")))
+        self._message_ids += 1
+        return _json({
+            "id": str(self._message_ids),
+            "channel_id": channel_id,
+            "author": BOT_USER,
+            "content": body.get("content", ""),
+            "timestamp": "2025-01-01T00:00:00+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+        })
+
+    async def _typing(self, request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        await socket.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": 41250}}))
+        try:
+            async for frame in socket:
+                if frame.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(frame.data)
+                if payload["op"] == 1:  # heartbeat
+                    await socket.send_str(json.dumps({"op": 11}))
+                elif payload["op"] == 2:  # identify
+                    self.identifies += 1
+                    await self._send_event(socket, "READY", {
+                        "v": 10,
+                        "user": BOT_USER,
+                        "guilds": [],
+                        "session_id": f"session-{self.identifies}",
+                        "resume_gateway_url": self.gateway_url,
+                        "application": {"id": BOT_USER["id"], "flags": 0},
+                    })
+                    self.sockets.append(socket)
+        finally:
+            if socket in self.sockets:
+                self.sockets.remove(socket)
+        return socket
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import time
+from aiohttp import web
+
+
+class StubLLMServer:
+    """Local OpenAI-compatible completion server for tests"""
+
+    def __init__(self, reply: str = "stub reply", delay: float = 0.0,
+                 inline_cost: float = None, chunk_size: int = 4,
+                 chunk_delay: float = 0.0, cached_tokens: int = 0):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.delay = delay
+        self.inline_cost = inline_cost
+        self.cached_tokens = cached_tokens
+        self.generation_lookups = 0
+        self.files = {}  # name -> bytes served under /files/
+        self.file_delay = 0.0
+        self.requests = []
+        self.model_replies = {}  # per-model override of reply
+        self.failures = []  # (status, retry_after, model) answered before any completion
+        self.model_delays = {}  # per-model override of delay
+        self.runner = None
+        self.port = None
+
+    def fail_next(self, status: int, times: int = 1, retry_after: str = None, model: str = None):
+        """Answer the next completion requests (for model, or any) with an HTTP error"""
+        self.failures.extend([(status, retry_after, model)] * times)
+
+    def file_url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.port}/files/{name}"
+
+    @property
+    def api_base(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v1"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/v1/chat/completions", self._chat_completions)
+        app.router.add_get("/api/v1/generation", self._generation)
+        app.router.add_get("/files/{name}", self._file)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _completion_body(self, model: str) -> dict:
+        body = {
+            "id": f"gen-{len(self.requests)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.model_replies.get(model, self.reply)},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": 10,
+                "completion_tokens": 5,
+                "total_tokens": 15,
+            },
+        }
+        if self.inline_cost is not None:
+            body["usage"]["cost"] = self.inline_cost
+        if self.cached_tokens:
+            body["usage"]["prompt_tokens_details"] = {"cached_tokens": self.cached_tokens}
+        return body
+
+    async def _chat_completions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests.append(body)
+        failure = next((f for f in self.failures if f[2] in (None, body.get("model"))), None)
+        if failure:
+            self.failures.remove(failure)
+            status, retry_after, _ = failure
+            headers = {"Retry-After": retry_after} if retry_after is not None else {}
+            return web.json_response(
+                {"error": {"message": f"injected {status}", "code": status}},
+                status=status, headers=headers
+            )
+        delay = self.model_delays.get(body.get("model"), self.delay)
+        if delay:
+            await asyncio.sleep(delay)
+        if body.get("stream"):
+            return await self._stream_completion(request, body.get("model", ""))
+        return web.json_response(self._completion_body(body.get("model", "")))
+
+    async def _stream_completion(self, request: web.Request, model: str) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        full = self._completion_body(model)
+
+        def event(choices, usage=None) -> bytes:
+            chunk = {
+                "id": full["id"],
+                "object": "chat.completion.chunk",
+                "created": full["created"],
+                "model": model,
+                "choices": choices,
+            }
+            if usage:
+                chunk["usage"] = usage
+            return f"data: {json.dumps(chunk)}\n\n".encode()
+
+        for start in range(0, len(self.reply), self.chunk_size):
+            delta = {"content": self.reply[start:start + self.chunk_size]}
+            await response.write(event([{"index": 0, "delta": delta, "finish_reason": None}]))
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+        await response.write(event([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        await response.write(event([], full["usage"]))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _generation(self, request: web.Request) -> web.Response:
+        self.generation_lookups += 1
+        return web.json_response({"data": {
+            "id": request.query.get("id"),
+            "total_cost": 0.0001,
+            "native_tokens_prompt": 12,
+            "native_tokens_completion": 5,
+        }})
+
+    async def _file(self, request: web.Request) -> web.Response:
+        if self.file_delay:
+            await asyncio.sleep(self.file_delay)
+        name = request.match_info["name"]
+        if name not in self.files:
+            return web.Response(status=404)
+        return web.Response(body=self.files[name], content_type="image/png")
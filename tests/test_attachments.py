@@ -0,0 +1,61 @@
+import tempfile
+from pyopenbot.attachments import AttachmentStore
+from pyopenbot.memory import Memory
+
+
+def image_message(store: AttachmentStore, text: str, data: bytes) -> list:
+    return [
+        {"type": "text", "text": text},
+        {"type": "image_ref", "image_ref": store.put(data, "image/png")},
+    ]
+
+
+class TestAttachmentStore:
+    def test_put_is_content_addressed(self):
+        store = AttachmentStore()
+
+        first = store.put(b"same bytes", "image/png")
+        second = store.put(b"same bytes", "image/png")
+
+        assert first == second
+        assert store.data_url(first) == "data:image/png;base64,c2FtZSBieXRlcw=="
+
+    def test_cache_is_lru_bounded(self):
+        store = AttachmentStore(cache_bytes=100)
+
+        old = store.put(b"a" * 40, "image/png")
+        new = store.put(b"b" * 40, "image/png")
+
+        assert store.data_url(old) is None
+        assert store.data_url(new) is not None
+
+    def test_disk_copy_outlives_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = AttachmentStore(tmp, cache_bytes=100)
+            old = store.put(b"a" * 40, "image/png")
+            store.put(b"b" * 40, "image/png")
+
+            assert AttachmentStore(tmp).data_url(old).startswith("data:image/png;base64,")
+
+
+class TestMemoryImages:
+    def test_memory_keeps_only_references(self):
+        store = AttachmentStore()
+        memory = Memory(type="unlimited", attachments=store)
+        memory.add_message("user", image_message(store, "[alice]: look", b"png bytes"))
+
+        assert memory.messages[0]["content"][1]["type"] == "image_ref"
+        assert memory.get_messages()[0]["content"][1]["type"] == "image_url"
+
+    def test_old_images_become_placeholders(self):
+        store = AttachmentStore()
+        memory = Memory(type="unlimited", attachments=store, image_turns=2)
+        memory.add_message("user", image_message(store, "[alice]: first", b"one"))
+        memory.add_message("assistant", "[bot]: nice")
+        memory.add_message("user", image_message(store, "[alice]: second", b"two"))
+        memory.add_message("user", "[alice]: and text")
+
+        messages = memory.get_messages()
+
+        assert messages[0]["content"][1] == {"type": "text", "text": "[image]"}
+        assert messages[2]["content"][1]["type"] == "image_url"
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from pyopenbot.channel_buffer import ChannelBuffer
+
+
+class TestChannelBuffer:
+    def test_peek_does_not_consume(self):
+        buffer = ChannelBuffer()
+        buffer.put("a", "A")
+        buffer.put("b", "B")
+
+        assert buffer.peek() == ["A", "B"]
+        assert buffer.peek() == ["A", "B"]
+        assert len(buffer) == 2
+        assert buffer.get_nowait() == "a"
+        assert buffer.peek() == ["B"]
+
+    def test_get_waits_for_put(self):
+        async def scenario():
+            buffer = ChannelBuffer()
+            getter = asyncio.create_task(buffer.get())
+            await asyncio.sleep(0.01)
+            assert not getter.done()
+            buffer.put("x")
+            return await getter
+
+        assert asyncio.run(scenario()) == "x"
+
+    def test_get_nowait_on_empty_raises(self):
+        with pytest.raises(asyncio.QueueEmpty):
+            ChannelBuffer().get_nowait()
+
+    def test_join_waits_for_task_done(self):
+        async def scenario():
+            buffer = ChannelBuffer()
+            buffer.put("x")
+            joiner = asyncio.create_task(buffer.join())
+            await asyncio.sleep(0.01)
+            assert not joiner.done()
+            buffer.get_nowait()
+            buffer.task_done()
+            await asyncio.wait_for(joiner, 1)
+
+        asyncio.run(scenario())
+
+    def test_concurrent_producers_keep_arrival_order(self):
+        async def scenario():
+            buffer = ChannelBuffer()
+            arrived = []
+
+            async def producer(name: str, delays):
+                for i, delay in enumerate(delays):
+                    await asyncio.sleep(delay)
+                    item = f"{name}{i}"
+                    arrived.append(item)
+                    buffer.put(item, item.upper())
+
+            async def consumer():
+                taken = []
+                while len(taken) < 12:
+                    taken.append(await buffer.get())
+                    await asyncio.sleep(0.002)
+                return taken
+
+            consumer_task = asyncio.create_task(consumer())
+            await asyncio.gather(
+                producer("a", [0.001, 0.004, 0.0, 0.003]),
+                producer("b", [0.002, 0.0, 0.005, 0.001]),
+                producer("c", [0.0, 0.003, 0.001, 0.002]),
+            )
+            peeked = buffer.peek()
+            taken = await consumer_task
+            return arrived, taken, peeked
+
+        arrived, taken, peeked = asyncio.run(scenario())
+
+        assert taken == arrived
+        assert peeked == [item.upper() for item in arrived[len(arrived) - len(peeked):]]
@@ -97,4 +97,68 @@ class TestCharacter:
         assert saved_config["llm"]["api_key_file"] == "path/to/key.txt"
         assert "api_key" not in saved_config["llm"]
         
-        temp_path.unlink()
\ No newline at end of file
+        temp_path.unlink()
+    
+    def test_memory_settings_round_trip(self):
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
+            temp_path = Path(f.name)
+        
+        character = Character(
+            character_name="WindowBot",
+            character_card="Test window",
+            platform="terminal",
+            llm_provider="openrouter",
+            llm_model="z-ai/glm-4.5",
+            api_key="direct-key",
+            settings={"temperature": 0.5},
+            memory_type="sliding_window",
+            memory_settings={"max_messages": 20}
+        )
+        character._api_key_source = "direct"
+        
+        character.save_to_yaml(temp_path)
+        loaded = Character.from_yaml(temp_path)
+        
+        assert loaded.memory_type == "sliding_window"
+        assert loaded.memory_settings == {"max_messages": 20}
+        
+        temp_path.unlink()
+
+    def test_model_chain_round_trip(self):
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
+            temp_path = Path(f.name)
+        
+        character = Character(
+            character_name="ChainBot",
+            character_card="Test chain",
+            platform="terminal",
+            llm_provider="openrouter",
+            llm_model="z-ai/glm-4.5",
+            api_key="direct-key",
+            settings={"temperature": 0.5},
+            memory_type="unlimited",
+            llm_models=[{"model": "z-ai/glm-4.5", "max_p95_ms": 3000}, {"model": "openai/gpt-4o-mini"}]
+        )
+        character._api_key_source = "direct"
+        
+        character.save_to_yaml(temp_path)
+        loaded = Character.from_yaml(temp_path)
+        
+        assert loaded.llm_models == character.llm_models
+        assert loaded.llm_model == "z-ai/glm-4.5"
+        
+        temp_path.unlink()
+
+    def test_validate_flags_missing_and_non_numeric_settings(self):
+        character = Character.from_yaml(Path("tests/fixtures/valid_config.yaml"))
+        assert character.errors() == []
+        
+        del character.settings["top_p"]
+        character.settings["temperature"] = "warm"
+        character.memory_type = "forever"
+        
+        assert character.errors() == [
+            "Temperature: Not a number: 'warm'",
+            "Top P: Missing",
+            "Memory: Invalid: forever",
+        ]
@@ -0,0 +1,36 @@
+import shutil
+from pathlib import Path
+from typer.testing import CliRunner
+from pyopenbot.cli.CLI import CLI
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+class TestCheck:
+    def test_single_config(self):
+        result = CliRunner().invoke(CLI().app, ["check", str(FIXTURES / "valid_config.yaml")])
+        
+        assert result.exit_code == 0
+        assert "Ready to run!" in result.output
+    
+    def test_all_reports_every_config(self, tmp_path):
+        for index in range(5):
+            shutil.copy(FIXTURES / "valid_config.yaml", tmp_path / f"good{index}.yaml")
+        shutil.copy(FIXTURES / "invalid_config.yaml", tmp_path / "bad.yaml")
+        (tmp_path / "broken.yml").write_text("character_name: [unclosed")
+        
+        result = CliRunner().invoke(CLI().app, ["check", "--all", str(tmp_path)], terminal_width=200)
+        
+        assert result.exit_code == 1
+        assert "2 of 7 configurations have errors" in result.output
+        assert "Invalid: invalid_platform" in result.output
+        assert "broken.yml" in result.output
+    
+    def test_all_passes_when_every_config_is_valid(self, tmp_path):
+        shutil.copy(FIXTURES / "valid_config.yaml", tmp_path / "good.yaml")
+        
+        result = CliRunner().invoke(CLI().app, ["check", "--all", str(tmp_path)])
+        
+        assert result.exit_code == 0
+        assert "All 1 configurations are ready to run!" in result.output
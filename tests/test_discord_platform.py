@@ -0,0 +1,473 @@
+import asyncio
+import time
+from typing import List
+from types import SimpleNamespace
+from pyopenbot.attachments import AttachmentStore
+from pyopenbot.llm_service import LLMService
+from pyopenbot.memory import Memory
+from pyopenbot.platforms.discord_platform import DiscordPlatform, split_message
+from tests.stub_server import StubLLMServer
+from tests.test_llm_service import make_character
+
+
+class FakeMessage:
+    def __init__(self, channel, content: str = "", author: str = "user"):
+        self.channel = channel
+        self.content = content
+        self.author = SimpleNamespace(name=author)
+        self.attachments = []
+        self.embeds = []
+        self.edits = 0
+
+    async def edit(self, content: str):
+        self.content = content
+        self.edits += 1
+        return self
+
+    async def reply(self, content: str):
+        return await self.channel.send(content)
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int = 1):
+        self.id = channel_id
+        self.sent = []
+        self.typing_calls = 0
+        self.history_messages = []  # oldest first, as posted
+        self.history_read = 0
+
+    async def history(self, limit: int):
+        for message in reversed(self.history_messages[-limit:]):
+            self.history_read += 1
+            yield message
+
+    async def typing(self):
+        self.typing_calls += 1
+
+    async def send(self, content: str):
+        message = FakeMessage(self, content)
+        self.sent.append(message)
+        return message
+
+
+class SlowChannel(FakeChannel):
+    """Channel whose sends take a while, so messages can arrive while one is in flight"""
+
+    def __init__(self, channel_id: int = 1, send_delay: float = 0.3):
+        super().__init__(channel_id)
+        self.send_delay = send_delay
+        self.sending = False
+
+    async def send(self, content: str):
+        self.sending = True
+        await asyncio.sleep(self.send_delay)
+        return await super().send(content)
+
+
+class FakeAttachment:
+    def __init__(self, url: str, size: int, proxy_url: str = None):
+        self.url = url
+        self.proxy_url = proxy_url or url
+        self.size = size
+        self.content_type = "image/png"
+
+
+def make_platform(api_base: str, channel_id="*", llm_settings=None, **discord_settings) -> DiscordPlatform:
+    character = make_character(api_base, **{"stream": True, **(llm_settings or {})})
+    character.platform = "discord"
+    character.discord_channel_id = channel_id
+    character.discord_settings = {"send_rate": 1000, **discord_settings}
+    return DiscordPlatform(character, LLMService(character), lambda channel: Memory(type="unlimited"))
+
+
+async def drain(platform: DiscordPlatform):
+    await asyncio.gather(*(state.queue.join() for state in platform.channels.values()))
+
+
+class TestSplitMessage:
+    def test_short_text_is_one_chunk(self):
+        assert split_message("hello") == ["hello"]
+
+    def test_prefers_line_breaks(self):
+        text = "a" * 15 + "\n" + "b" * 10
+        assert split_message(text, limit=20) == ["a" * 15, "b" * 10]
+
+    def test_prefers_paragraphs_then_sentences(self):
+        text = "a" * 5 + "\n" + "b" * 5 + "\n\n" + "c" * 10
+        assert split_message(text, limit=20) == ["a" * 5 + "\n" + "b" * 5, "c" * 10]
+        assert split_message("One two. Three four five", limit=20) == ["One two.", "Three four five"]
+
+    def test_hard_splits_without_line_breaks(self):
+        assert split_message("x" * 45, limit=20) == ["x" * 20, "x" * 20, "x" * 5]
+
+
+class TestStreamReply:
+    def test_streams_into_edited_and_split_messages(self):
+        reply = "word " * 500  # 2500 characters
+
+        async def scenario():
+            async with StubLLMServer(reply=reply, chunk_size=100) as server:
+                platform = make_platform(server.api_base, stream_edit_interval=0)
+                channel = FakeChannel()
+                stream = platform.llm_service.stream_response("hi", [{"role": "user", "content": "hi"}])
+                replied = await platform._stream_reply(FakeMessage(channel), stream)
+                return replied, channel.sent
+
+        replied, sent = asyncio.run(scenario())
+
+        assert replied
+        assert [m.content for m in sent] == split_message(reply.strip())
+        assert sent[0].edits > 0
+
+    def test_no_response_is_never_sent(self):
+        async def scenario():
+            async with StubLLMServer(reply="[NO_RESPONSE]", chunk_size=3) as server:
+                platform = make_platform(server.api_base, stream_edit_interval=0)
+                channel = FakeChannel()
+                stream = platform.llm_service.stream_response("hi", [{"role": "user", "content": "hi"}])
+                replied = await platform._stream_reply(FakeMessage(channel), stream)
+                return replied, stream.text, channel.sent
+
+        replied, text, sent = asyncio.run(scenario())
+
+        assert not replied
+        assert text == "[NO_RESPONSE]"
+        assert sent == []
+
+
+class TestImageDownloads:
+    def test_downloads_run_concurrently_on_one_session(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                server.file_delay = 0.2
+                for i in range(4):
+                    server.files[f"{i}.png"] = bytes([i]) * 100
+                platform = make_platform(server.api_base)
+                attachments = [FakeAttachment(server.file_url(f"{i}.png"), 100) for i in range(4)]
+
+                started = time.perf_counter()
+                results = await platform._download_images(attachments)
+                elapsed = time.perf_counter() - started
+                session = platform.http_session
+                await platform.aclose()
+                return results, elapsed, session
+
+        results, elapsed, session = asyncio.run(scenario())
+
+        assert [data for data, _ in results] == [bytes([i]) * 100 for i in range(4)]
+        assert elapsed < 0.6  # four 0.2s downloads in series would take 0.8s
+        assert session.closed
+
+    def test_size_cap_and_proxy_fallback(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                server.files["big.png"] = b"x" * 2048
+                server.files["ok.png"] = b"ok"
+                platform = make_platform(server.api_base, max_image_mb=0.001)
+                results = await platform._download_images([
+                    FakeAttachment(server.file_url("big.png"), 2048),
+                    FakeAttachment(server.file_url("big.png"), 10),  # lies about its size
+                    FakeAttachment(server.file_url("missing.png"), 2, server.file_url("ok.png")),
+                ])
+                await platform.aclose()
+                return results
+
+        too_big, streamed_too_big, via_proxy = asyncio.run(scenario())
+
+        assert isinstance(too_big, Exception)
+        assert isinstance(streamed_too_big, Exception)
+        assert via_proxy == (b"ok", "image/png")
+
+
+class TestChannels:
+    def test_channel_filter(self):
+        platform = make_platform("http://unused", channel_id=[123, "456"])
+
+        assert platform._should_respond(FakeMessage(FakeChannel(123)))
+        assert platform._should_respond(FakeMessage(FakeChannel(456)))
+        assert not platform._should_respond(FakeMessage(FakeChannel(789)))
+        assert make_platform("http://unused")._should_respond(FakeMessage(FakeChannel(789)))
+
+    def test_channels_run_in_parallel_and_keep_order(self):
+        async def scenario():
+            async with StubLLMServer(delay=0.3) as server:
+                platform = make_platform(server.api_base, llm_settings={"stream": False})
+                slow, fast = FakeChannel(1), FakeChannel(2)
+                started = time.perf_counter()
+                for text in ("first", "second"):
+                    await platform.enqueue_message(FakeMessage(slow, text, author="alice"))
+                await platform.enqueue_message(FakeMessage(fast, "hello", author="bob"))
+                await drain(platform)
+                elapsed = time.perf_counter() - started
+                await platform.aclose()
+                return platform, elapsed
+
+        platform, elapsed = asyncio.run(scenario())
+
+        assert elapsed < 0.8  # three 0.3s calls in series would take 0.9s
+        slow_memory = platform.channels["1"].memory.messages
+        assert [m["content"] for m in slow_memory if m["role"] == "user"] == [
+            "[alice]: first", "[alice]: second"
+        ]
+        assert len(platform.channels["2"].memory.messages) == 2
+
+    def test_concurrency_cap_is_global(self):
+        async def scenario():
+            async with StubLLMServer(delay=0.2) as server:
+                platform = make_platform(server.api_base, llm_settings={"stream": False, "max_concurrency": 1})
+                started = time.perf_counter()
+                for channel_id in (1, 2, 3):
+                    await platform.enqueue_message(FakeMessage(FakeChannel(channel_id), "hi"))
+                await drain(platform)
+                elapsed = time.perf_counter() - started
+                await platform.aclose()
+                return elapsed
+
+        assert asyncio.run(scenario()) >= 0.6
+
+    def test_concurrent_producers_are_answered_in_arrival_order(self):
+        async def scenario():
+            async with StubLLMServer(delay=0.01) as server:
+                platform = make_platform(server.api_base, llm_settings={"stream": False})
+                channel = FakeChannel()
+                arrived = []
+
+                async def on_message(author: str, count: int):
+                    for i in range(count):
+                        await asyncio.sleep(0.003 * (i % 3))
+                        arrived.append(f"[{author}]: {author} {i}")
+                        await platform.enqueue_message(FakeMessage(channel, f"{author} {i}", author=author))
+
+                await asyncio.gather(on_message("alice", 4), on_message("bob", 4), on_message("carol", 4))
+                await drain(platform)
+                await platform.aclose()
+                return platform, arrived, server.requests
+
+        platform, arrived, requests = asyncio.run(scenario())
+
+        memory = platform.channels["1"].memory.messages
+        assert [m["content"] for m in memory if m["role"] == "user"] == arrived
+        # Pending lines sent with the first call follow arrival order too
+        pending = [m["content"] for m in requests[0]["messages"] if m["role"] == "user" and "PENDING" in m["content"]]
+        assert pending == [line.replace("]:", " - PENDING]:", 1) for line in arrived[1:1 + len(pending)]]
+
+
+class TestCoalescing:
+    def test_burst_becomes_one_completion(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                platform = make_platform(server.api_base, llm_settings={"stream": False}, coalesce_window=0.1)
+                channel = FakeChannel()
+                for i in range(5):
+                    await platform.enqueue_message(FakeMessage(channel, f"msg {i}"))
+                await drain(platform)
+                await platform.aclose()
+                return platform, server.requests, channel.sent
+
+        platform, requests, sent = asyncio.run(scenario())
+
+        assert len(requests) == 1
+        assert len(sent) == 1
+        assert "last 5 messages" in requests[0]["messages"][-1]["content"]
+        user_messages = [m for m in platform.channels["1"].memory.messages if m["role"] == "user"]
+        assert len(user_messages) == 5
+        stats = platform.llm_service.metrics.snapshot()
+        assert stats["coalesced_calls_saved"] == 4
+        assert stats["coalesced_tokens_saved"] > 0
+
+    def test_messages_during_a_reply_are_merged(self):
+        async def scenario():
+            async with StubLLMServer(delay=0.2) as server:
+                platform = make_platform(server.api_base, llm_settings={"stream": False}, coalesce_window=0)
+                channel = FakeChannel()
+                await platform.enqueue_message(FakeMessage(channel, "first"))
+                await asyncio.sleep(0.05)  # first reply is being generated
+                for i in range(3):
+                    await platform.enqueue_message(FakeMessage(channel, f"later {i}"))
+                await drain(platform)
+                await platform.aclose()
+                return server.requests
+
+        assert len(asyncio.run(scenario())) == 2
+
+
+class TestSupersede:
+    def test_newer_messages_cancel_and_regenerate(self):
+        async def scenario():
+            async with StubLLMServer(delay=0.3) as server:
+                platform = make_platform(server.api_base, llm_settings={"stream": False}, supersede_after=2)
+                channel = FakeChannel()
+                await platform.enqueue_message(FakeMessage(channel, "what is 2+3?"))
+                while not server.requests:  # wait until the first completion is in flight
+                    await asyncio.sleep(0.01)
+                await platform.enqueue_message(FakeMessage(channel, "sorry"))
+                await platform.enqueue_message(FakeMessage(channel, "I meant 2+2"))
+                await drain(platform)
+                await platform.aclose()
+                return platform, server.requests, channel.sent
+
+        platform, requests, sent = asyncio.run(scenario())
+
+        assert len(requests) == 2
+        assert len(sent) == 1
+        assert "last 3 messages" in requests[1]["messages"][-1]["content"]
+        stats = platform.llm_service.metrics.snapshot()
+        assert stats["superseded_generations"] == 1
+        assert stats["superseded_tokens_wasted"] > 0
+
+    def test_steady_stream_supersedes_at_most_once(self):
+        async def scenario():
+            async with StubLLMServer(delay=0.3) as server:
+                platform = make_platform(server.api_base, llm_settings={"stream": False}, supersede_after=1)
+                channel = FakeChannel()
+                for i in range(12):
+                    await platform.enqueue_message(FakeMessage(channel, f"message {i}"))
+                    await asyncio.sleep(0.1)
+                await drain(platform)
+                await platform.aclose()
+                return platform, server.requests, channel.sent
+
+        platform, requests, sent = asyncio.run(scenario())
+
+        superseded = platform.llm_service.metrics.counters["superseded_generations"]
+        assert len(sent) >= 2
+        assert superseded <= len(sent)  # each turn regenerates once, then answers
+        assert len(requests) == superseded + len(sent)
+
+    def test_supersede_during_first_send_leaves_no_orphan(self):
+        async def scenario():
+            async with StubLLMServer(reply="word " * 20, chunk_size=5, chunk_delay=0.02) as server:
+                platform = make_platform(server.api_base, supersede_after=1, stream_edit_interval=0)
+                channel = SlowChannel()
+                await platform.enqueue_message(FakeMessage(channel, "first"))
+                while not channel.sending:  # first chunk is on its way to Discord
+                    await asyncio.sleep(0.01)
+                await platform.enqueue_message(FakeMessage(channel, "second"))
+                await drain(platform)
+                await platform.aclose()
+                return platform, server.requests, channel.sent
+
+        platform, requests, sent = asyncio.run(scenario())
+
+        assert len(requests) == 2
+        assert "superseded_generations" not in platform.llm_service.metrics.snapshot()
+        assert [m.content for m in sent] == [("word " * 20).strip()] * 2
+
+    def test_posted_stream_is_not_cancelled(self):
+        async def scenario():
+            async with StubLLMServer(reply="word " * 20, chunk_size=5, chunk_delay=0.02) as server:
+                platform = make_platform(server.api_base, supersede_after=1, stream_edit_interval=0)
+                channel = FakeChannel()
+                await platform.enqueue_message(FakeMessage(channel, "first"))
+                await asyncio.sleep(0.15)  # reply is already on screen
+                await platform.enqueue_message(FakeMessage(channel, "second"))
+                await drain(platform)
+                await platform.aclose()
+                return platform, server.requests
+
+        platform, requests = asyncio.run(scenario())
+
+        assert len(requests) == 2
+        assert "superseded_generations" not in platform.llm_service.metrics.snapshot()
+
+
+class TestGate:
+    def run_gated(self, classifier_answer: str, classifier_status: int = None):
+        async def scenario():
+            async with StubLLMServer() as server:
+                server.model_replies["tiny-model"] = classifier_answer
+                if classifier_status:
+                    server.fail_next(classifier_status, model="tiny-model")
+                platform = make_platform(
+                    server.api_base,
+                    llm_settings={"stream": False},
+                    gate={"classifier_model": "tiny-model"}
+                )
+                channel = FakeChannel()
+                await platform.enqueue_message(FakeMessage(channel, "anyone up for lunch?"))
+                await drain(platform)
+                await platform.aclose()
+                return platform, server.requests, channel.sent
+
+        return asyncio.run(scenario())
+
+    def test_gate_skips_the_full_model(self):
+        platform, requests, sent = self.run_gated("NO")
+
+        assert [request["model"] for request in requests] == ["tiny-model"]
+        assert sent == []
+        assert [m["role"] for m in platform.channels["1"].memory.messages] == ["user"]
+        assert platform.llm_service.metrics.snapshot()["gate_skipped"] == 1
+
+    def test_gate_lets_the_full_model_reply(self):
+        platform, requests, sent = self.run_gated("YES")
+
+        assert [request["model"] for request in requests] == ["tiny-model", "z-ai/glm-4.5"]
+        assert len(sent) == 1
+
+    def test_failing_classifier_does_not_silence_the_bot(self):
+        platform, requests, sent = self.run_gated("NO", classifier_status=400)
+
+        assert [request["model"] for request in requests] == ["tiny-model", "z-ai/glm-4.5"]
+        assert len(sent) == 1
+        assert platform.channels["1"].gate.classifier_errors == 1
+
+
+class TestResume:
+    def run_resume(self, history: List[FakeMessage], count: int, memory: Memory, **discord_settings):
+        async def scenario():
+            async with StubLLMServer() as server:
+                platform = make_platform(server.api_base, **discord_settings)
+                platform.memory_factory = lambda channel: memory
+                channel.history_messages = history
+                await platform._cmd_resume(SimpleNamespace(channel=channel, send=channel.send), count)
+                await platform.aclose()
+
+        channel = history[0].channel
+        asyncio.run(scenario())
+        return channel
+
+    def test_restores_in_order_and_skips_commands(self):
+        channel = FakeChannel()
+        history = [FakeMessage(channel, text, author) for text, author in
+                   [("hi", "ann"), ("/stats", "ann"), ("hello", "bob"), ("bye", "ann")]]
+        memory = Memory(type="unlimited")
+
+        channel = self.run_resume(history, 10, memory)
+
+        assert [m["content"] for m in memory.messages] == ["[ann]: hi", "[bob]: hello", "[ann]: bye"]
+        assert channel.sent[0].content.startswith("✅ Restored 3 messages")
+        assert "skipped 1" in channel.sent[0].content
+
+    def test_stops_reading_once_memory_is_full(self):
+        channel = FakeChannel()
+        history = [FakeMessage(channel, f"message {i}") for i in range(100)]
+        memory = Memory(type="sliding_window", max_messages=5)
+
+        channel = self.run_resume(history, 100, memory)
+
+        assert [m["content"] for m in memory.messages] == [f"[user]: message {i}" for i in range(95, 100)]
+        assert channel.history_read == 6  # the five kept and the one that did not fit
+        assert "memory is full" in channel.sent[0].content
+
+    def test_fetches_images_when_enabled(self):
+        channel = FakeChannel()
+        memory = Memory(type="unlimited", attachments=AttachmentStore())
+
+        async def scenario():
+            async with StubLLMServer() as server:
+                server.files["cat.png"] = b"cat"
+                message = FakeMessage(channel, "look", "ann")
+                message.attachments = [FakeAttachment(server.file_url("cat.png"), 3)]
+                channel.history_messages = [message, FakeMessage(channel, "nice", "bob")]
+                platform = make_platform(server.api_base, resume_images=True)
+                platform.memory_factory = lambda channel: memory
+                await platform._cmd_resume(SimpleNamespace(channel=channel, send=channel.send), 10)
+                await platform.aclose()
+
+        asyncio.run(scenario())
+
+        first, second = memory.messages
+        assert first["content"][0] == {"type": "text", "text": "[ann]: look"}
+        assert memory.attachments.data_url(first["content"][1]["image_ref"]) == "data:image/png;base64,Y2F0"
+        assert second["content"] == "[bob]: nice"
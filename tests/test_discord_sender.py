@@ -0,0 +1,110 @@
+import asyncio
+import time
+from pyopenbot.platforms.discord_sender import DiscordSender, TokenBucket
+from tests.test_discord_platform import FakeChannel, FakeMessage
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        async def scenario():
+            bucket = TokenBucket(rate=20, burst=3)
+            start = time.monotonic()
+            for _ in range(5):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        # Three pass at once, the other two wait 1/20s each
+        assert 0.08 <= asyncio.run(scenario()) < 0.5
+
+
+class TestDiscordSender:
+    def test_queued_sends_are_coalesced(self):
+        channel = FakeChannel()
+
+        async def scenario():
+            sender = DiscordSender(rate=1000)
+            results = await asyncio.gather(*(sender.send(channel, f"line {i}") for i in range(3)))
+            await sender.aclose()
+            return results
+
+        results = asyncio.run(scenario())
+        # All three queued before the outbox drained, so they go out as one
+        assert [m.content for m in channel.sent] == ["line 0\nline 1\nline 2"]
+        assert results[0] == results[1] == results[2]
+
+    def test_coalescing_respects_the_limit(self):
+        channel = FakeChannel()
+
+        async def scenario():
+            sender = DiscordSender(rate=1000, limit=10)
+            await asyncio.gather(*(sender.send(channel, "x" * 6) for _ in range(3)))
+            await sender.aclose()
+
+        asyncio.run(scenario())
+        assert [m.content for m in channel.sent] == ["x" * 6] * 3
+
+    def test_cancelled_sends_are_not_posted(self):
+        channel = FakeChannel()
+
+        async def scenario():
+            sender = DiscordSender(rate=1000, burst=1)
+            sender._outbox(channel).bucket.tokens = 0  # the queue waits for the bucket
+            first = asyncio.create_task(sender.send(channel, "given up"))
+            second = asyncio.create_task(sender.send(channel, "kept"))
+            third = asyncio.create_task(sender.send(channel, "also given up"))
+            await asyncio.sleep(0)
+            first.cancel()
+            third.cancel()
+            await asyncio.gather(first, second, third, return_exceptions=True)
+            await sender.aclose()
+
+        asyncio.run(scenario())
+        assert [m.content for m in channel.sent] == ["kept"]
+
+    def test_long_reply_is_split(self):
+        channel = FakeChannel()
+        message = FakeMessage(channel, "hi")
+
+        async def scenario():
+            sender = DiscordSender(rate=1000, coalesce=False, limit=20)
+            sent = await sender.reply(message, "a" * 15 + "\n\n" + "b" * 15)
+            await sender.aclose()
+            return sent
+
+        sent = asyncio.run(scenario())
+        assert [m.content for m in sent] == ["a" * 15, "b" * 15]
+
+    def test_only_the_newest_queued_edit_is_made(self):
+        channel = FakeChannel()
+
+        async def scenario():
+            sender = DiscordSender(rate=1000)
+            first = await channel.send("start")
+            other = await channel.send("other")
+            # The edit to other holds the worker while first's edits queue up
+            await asyncio.gather(
+                sender.edit(other, "other 2"),
+                *(sender.edit(first, f"v{i}") for i in range(4))
+            )
+            await sender.aclose()
+            return first
+
+        first = asyncio.run(scenario())
+        assert first.content == "v3"
+        assert first.edits == 1
+
+    def test_typing_stops_when_work_is_done(self):
+        channel = FakeChannel()
+
+        async def scenario():
+            sender = DiscordSender(typing_interval=0.05)
+            async with sender.typing(channel):
+                await asyncio.sleep(0.12)
+            calls = channel.typing_calls
+            await asyncio.sleep(0.12)
+            await sender.aclose()
+            return calls
+
+        calls = asyncio.run(scenario())
+        assert calls >= 2
+        assert channel.typing_calls == calls
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from pyopenbot.gate import ResponseGate
+
+
+def decide(gate: ResponseGate, text: str, addressed: bool = False, recent=None) -> bool:
+    return asyncio.run(gate.should_reply(text, addressed, recent or [{"role": "user", "content": text}]))
+
+
+class TestResponseGate:
+    def test_addressed_messages_always_pass(self):
+        gate = ResponseGate(otherwise="skip", max_unprompted_per_minute=0)
+        assert decide(gate, "hey", addressed=True)
+
+    def test_keywords_pass_and_others_follow_policy(self):
+        gate = ResponseGate(keywords=["OpenBot"], otherwise="skip")
+        assert decide(gate, "is openbot around?")
+        assert not decide(gate, "openbots are cool")
+        assert not decide(gate, "lunch?")
+        assert decide(ResponseGate(), "lunch?")
+
+    def test_unprompted_replies_are_rate_limited(self):
+        gate = ResponseGate(max_unprompted_per_minute=2)
+        assert [decide(gate, "hi") for _ in range(3)] == [True, True, False]
+        assert decide(gate, "hi", addressed=True)
+
+    def test_classifier_sees_only_recent_messages(self):
+        seen = []
+
+        async def classifier(messages):
+            seen.append(messages)
+            return messages[-1]["content"] == "question?"
+
+        gate = ResponseGate(classifier=classifier, classifier_messages=2)
+        history = [{"role": "user", "content": str(i)} for i in range(5)]
+        assert decide(gate, "question?", recent=history + [{"role": "user", "content": "question?"}])
+        assert not decide(gate, "4", recent=history)
+        assert len(seen[0]) == 2
+
+    def test_failing_classifier_falls_back_to_policy(self):
+        async def classifier(messages):
+            raise RuntimeError("classifier returned 400")
+
+        replying = ResponseGate(classifier=classifier)
+        assert decide(replying, "lunch?")
+        assert replying.classifier_errors == 1
+        assert not decide(ResponseGate(classifier=classifier, otherwise="skip"), "lunch?")
+
+    def test_from_settings_rejects_unknown_policy(self):
+        with pytest.raises(ValueError):
+            ResponseGate.from_settings({"otherwise": "maybe"})
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from pyopenbot.character import find_character_configs
+from pyopenbot.host import CharacterHost
+from tests.test_llm_service import make_character
+
+
+def make_discord_character(name: str, token: str):
+    character = make_character("http://unused")
+    character.character_name = name
+    character.platform = "discord"
+    character.discord_token = token
+    character.discord_channel_id = "*"
+    return character
+
+
+class TestCharacterHost:
+    def test_finds_configs_in_directories(self, tmp_path):
+        for name in ["b.yaml", "a.yml", "notes.txt"]:
+            (tmp_path / name).write_text("")
+        extra = tmp_path / "extra.yaml"
+
+        assert find_character_configs([tmp_path]) == [tmp_path / "a.yml", tmp_path / "b.yaml"]
+        assert find_character_configs([tmp_path, extra]) == [
+            tmp_path / "a.yml", tmp_path / "b.yaml", extra
+        ]
+
+    def test_rejects_characters_that_cannot_share_a_process(self):
+        terminal = make_character("http://unused")
+        with pytest.raises(ValueError, match="only discord"):
+            CharacterHost([terminal])
+        with pytest.raises(ValueError, match="token"):
+            CharacterHost([make_discord_character("a", "same"), make_discord_character("b", "same")])
+        with pytest.raises(ValueError, match="name"):
+            CharacterHost([make_discord_character("a", "one"), make_discord_character("a", "two")])
+
+    def test_characters_share_pool_client_and_limiter(self):
+        async def scenario():
+            host = CharacterHost(
+                [make_discord_character(f"bot{i}", f"token{i}") for i in range(3)],
+                max_concurrency=5
+            )
+            host.build()
+            services = [platform.llm_service for platform in host.platforms.values()]
+            clients = {id(service._get_client()) for service in services}
+            limiters = {id(service.limiter) for service in services}
+            sessions = [await service._get_session() for service in services]
+            connectors = {id(session.connector) for session in sessions}
+            memories = [platform._channel(1).memory for platform in host.platforms.values()]
+            for platform in host.platforms.values():
+                await platform.aclose()
+            await host.aclose()
+            return clients, limiters, connectors, memories, services[0].limiter
+
+        clients, limiters, connectors, memories, limiter = asyncio.run(scenario())
+
+        assert len(clients) == len(limiters) == len(connectors) == 1
+        assert limiter._value == 5
+        assert len({id(memory) for memory in memories}) == 3
@@ -0,0 +1,71 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pyopenbot.images import ImagePreprocessor
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def make_png(width: int, height: int) -> bytes:
+    image = Image.new("RGBA", (width, height), (200, 30, 30, 128))
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"  # Make
+    output = io.BytesIO()
+    image.save(output, format="PNG", exif=exif)
+    return output.getvalue()
+
+
+class TestImagePreprocessor:
+    def test_downscales_and_strips_metadata_in_worker_process(self):
+        original = make_png(3000, 2000)
+        preprocessor = ImagePreprocessor(max_edge=1000, image_format="jpeg")
+
+        async def scenario():
+            return await preprocessor.process("attachment-1", original, "image/png")
+
+        try:
+            data, content_type = asyncio.run(scenario())
+        finally:
+            preprocessor.close()
+
+        assert content_type == "image/jpeg"
+        with Image.open(io.BytesIO(data)) as image:
+            assert max(image.size) == 1000
+            assert image.mode == "RGB"
+            assert not image.getexif()
+
+    def test_exif_orientation_is_applied_before_stripping(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: the camera was turned, rotate 90° clockwise to view
+        output = io.BytesIO()
+        Image.new("RGB", (300, 100)).save(output, format="JPEG", exif=exif)
+        executor = ThreadPoolExecutor(max_workers=1)
+        preprocessor = ImagePreprocessor(max_edge=1000, executor=executor)
+
+        async def scenario():
+            return await preprocessor.process("photo", output.getvalue(), "image/jpeg")
+
+        data, _ = asyncio.run(scenario())
+        executor.shutdown()
+
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.size == (100, 300)
+            assert not image.getexif()
+
+    def test_results_are_cached_by_attachment_id(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        preprocessor = ImagePreprocessor(max_edge=64, executor=executor)
+
+        async def scenario():
+            first = await preprocessor.process(42, make_png(256, 256), "image/png")
+            # A retry or /resume hits the cache even with different bytes
+            second = await preprocessor.process(42, b"not even an image", "image/png")
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        executor.shutdown()
+
+        assert second is first
+        assert first[1] == "image/webp"
+        assert preprocessor.cached(42) is first
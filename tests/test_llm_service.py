@@ -0,0 +1,330 @@
+import asyncio
+import time
+from pyopenbot.character import Character
+from pyopenbot.llm_service import LLMService
+from tests.stub_server import StubLLMServer
+
+
+def make_character(api_base: str, **settings) -> Character:
+    return Character(
+        character_name="StubBot",
+        character_card="You are a test bot.",
+        platform="terminal",
+        llm_provider="openrouter",
+        llm_model="z-ai/glm-4.5",
+        api_key="test-key",
+        settings={
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "max_tokens": 100,
+            "context_window": 8192,
+            "api_base": api_base,
+            **settings,
+        },
+        memory_type="unlimited"
+    )
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst delay between scheduled and actual wake-ups"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+class TestLLMService:
+    def test_get_response_against_stub(self):
+        async def scenario():
+            async with StubLLMServer(reply="hello from stub") as server:
+                service = LLMService(make_character(server.api_base))
+                response, usage = await service.get_response(
+                    "hi", [{"role": "user", "content": "hi"}]
+                )
+                return response, usage, server.requests
+
+        response, usage, requests = asyncio.run(scenario())
+
+        assert response == "hello from stub"
+        assert requests[0]["messages"] == [{"role": "user", "content": "hi"}]
+        assert requests[0]["temperature"] == 0.7
+        assert usage == {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+
+    def test_cost_lookup_runs_after_response_is_returned(self):
+        corrections = []
+
+        async def scenario():
+            async with StubLLMServer() as server:
+                service = LLMService(make_character(server.api_base))
+                service.usage_lookup_delay = 0.1
+
+                started = time.perf_counter()
+                _, usage = await service.get_response(
+                    "hi", [{"role": "user", "content": "hi"}],
+                    on_usage=corrections.append
+                )
+                elapsed = time.perf_counter() - started
+                assert not corrections
+
+                await service.aclose()
+                return usage, elapsed
+
+        usage, elapsed = asyncio.run(scenario())
+
+        assert "cost" not in usage
+        assert elapsed < 1.0
+        assert corrections == [{"cost": 0.0001, "prompt_tokens": 2, "completion_tokens": 0}]
+
+    def test_inline_cost_skips_generation_lookup(self):
+        corrections = []
+
+        async def scenario():
+            async with StubLLMServer(inline_cost=0.0002) as server:
+                service = LLMService(make_character(server.api_base))
+                _, usage = await service.get_response(
+                    "hi", [{"role": "user", "content": "hi"}],
+                    on_usage=corrections.append
+                )
+                await service.aclose()
+                return usage, server.generation_lookups
+
+        usage, lookups = asyncio.run(scenario())
+
+        assert usage["cost"] == 0.0002
+        assert lookups == 0
+        assert corrections == []
+
+    def test_concurrent_completions_keep_event_loop_responsive(self):
+        concurrency = 20
+        delay = 0.3
+
+        async def scenario():
+            async with StubLLMServer(delay=delay) as server:
+                service = LLMService(make_character(server.api_base))
+                stop = asyncio.Event()
+                lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+                started = time.perf_counter()
+                await asyncio.gather(*[
+                    service.get_response("hi", [{"role": "user", "content": f"hi {i}"}])
+                    for i in range(concurrency)
+                ])
+                elapsed = time.perf_counter() - started
+
+                stop.set()
+                return await lag_task, elapsed, len(server.requests)
+
+        max_lag, elapsed, request_count = asyncio.run(scenario())
+        print(
+            f"\n{concurrency} concurrent completions ({delay}s each): "
+            f"wall {elapsed:.2f}s, max event-loop lag {max_lag * 1000:.1f}ms"
+        )
+
+        assert request_count == concurrency
+        # A blocking client would stall the loop for the full completion
+        # delay per request; the async path only sees scheduling jitter
+        assert max_lag < delay
+
+    def test_stream_response_yields_deltas_and_usage(self):
+        async def scenario():
+            async with StubLLMServer(reply="streamed reply text", chunk_size=5) as server:
+                service = LLMService(make_character(server.api_base))
+                stream = service.stream_response("hi", [{"role": "user", "content": "hi"}])
+                deltas = [delta async for delta in stream]
+                return deltas, stream, service.metrics.snapshot()
+
+        deltas, stream, metrics = asyncio.run(scenario())
+
+        assert deltas == ["strea", "med r", "eply ", "text"]
+        assert stream.text == "streamed reply text"
+        assert stream.usage["total_tokens"] == 15
+        assert stream.time_to_first_token is not None
+        assert metrics["ttft_ms_p50"] is not None
+
+    def test_cache_control_marks_stable_prefix(self):
+        async def scenario():
+            async with StubLLMServer(cached_tokens=8) as server:
+                character = make_character(server.api_base)
+                character.llm_model = "anthropic/claude-sonnet-4"
+                service = LLMService(character)
+                history = [
+                    {"role": "system", "content": "persona"},
+                    {"role": "user", "content": "old"},
+                    {"role": "assistant", "content": "reply"},
+                    {"role": "system", "content": "Now responding"},
+                ]
+                _, usage = await service.get_response("Now responding", history, stable_prefix=3)
+                return usage, server.requests[0]["messages"], history
+
+        usage, sent, history = asyncio.run(scenario())
+
+        marked = [i for i, m in enumerate(sent) if isinstance(m["content"], list)
+                  and m["content"][-1].get("cache_control")]
+        assert marked == [0, 2]
+        assert sent[3]["content"] == "Now responding"
+        assert history[0]["content"] == "persona"  # caller's messages are not modified
+        assert usage["cached_tokens"] == 8
+
+    def test_no_cache_control_for_automatic_caching_providers(self):
+        service = LLMService(make_character("http://unused"))
+        messages = [{"role": "system", "content": "persona"}, {"role": "user", "content": "hi"}]
+
+        assert service._build_messages("hi", messages, stable_prefix=1) == messages
+
+
+class TestResilience:
+    def run_call(self, configure, **settings):
+        async def scenario():
+            async with StubLLMServer() as server:
+                configure(server)
+                service = LLMService(make_character(server.api_base, retry_base_delay=0.01, **settings))
+                started = time.perf_counter()
+                try:
+                    result = await service.get_response("hi", [{"role": "user", "content": "hi"}])
+                except Exception as error:
+                    result = error
+                return result, time.perf_counter() - started, service, len(server.requests)
+
+        return asyncio.run(scenario())
+
+    def test_rate_limit_is_retried_after_retry_after(self):
+        result, elapsed, service, requests = self.run_call(
+            lambda server: server.fail_next(429, retry_after="0.3")
+        )
+
+        assert result[0] == "stub reply"
+        assert requests == 2
+        assert elapsed >= 0.3
+        assert service.metrics.counters["llm_retries"] == 1
+
+    def test_server_errors_give_up_after_attempts(self):
+        result, _, service, requests = self.run_call(
+            lambda server: server.fail_next(503, times=5), retry_attempts=3
+        )
+
+        assert isinstance(result, Exception)
+        assert requests == 3
+        assert service.metrics.counters["llm_errors"] == 3
+
+    def test_bad_requests_are_not_retried(self):
+        result, _, _, requests = self.run_call(lambda server: server.fail_next(400))
+
+        assert isinstance(result, Exception)
+        assert requests == 1
+
+    def test_hung_request_times_out(self):
+        def hang(server):
+            server.delay = 5
+
+        result, elapsed, service, requests = self.run_call(hang, request_timeout=0.2, retry_attempts=2)
+
+        assert isinstance(result, TimeoutError)
+        assert elapsed < 1
+        assert service.metrics.counters["llm_timeouts"] == 2
+
+    def test_circuit_breaker_fails_fast_during_outage(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                server.fail_next(500, times=10)
+                service = LLMService(make_character(
+                    server.api_base, retry_attempts=1, circuit_failures=2, circuit_reset=30
+                ))
+                errors = []
+                for _ in range(4):
+                    try:
+                        await service.get_response("hi", [{"role": "user", "content": "hi"}])
+                    except Exception as error:
+                        errors.append(type(error).__name__)
+                return errors, len(server.requests), service.metrics.counters
+
+        errors, requests, counters = asyncio.run(scenario())
+
+        assert requests == 2
+        assert errors[2:] == ["CircuitOpenError", "CircuitOpenError"]
+        assert counters["llm_circuit_rejected"] == 2
+
+
+PRIMARY, BACKUP = "z-ai/glm-4.5", "openai/gpt-4o-mini"
+
+
+def make_chain_service(api_base: str, primary: dict = None, **settings) -> LLMService:
+    character = make_character(api_base, retry_base_delay=0.01, **settings)
+    character.llm_models = [{"model": PRIMARY, **(primary or {})}, {"model": BACKUP}]
+    return LLMService(character)
+
+
+class TestModelRouting:
+    def test_falls_back_when_primary_fails(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                server.fail_next(503, times=5, model=PRIMARY)
+                service = make_chain_service(server.api_base)
+                response, _ = await service.get_response("hi", [{"role": "user", "content": "hi"}])
+                return response, [request["model"] for request in server.requests], service
+
+        response, models, service = asyncio.run(scenario())
+
+        assert response == "stub reply"
+        assert models == [PRIMARY, BACKUP]
+        assert service.metrics.counters["llm_fallbacks"] == 1
+        assert service.model_stats()[PRIMARY]["error_rate"] == 1
+
+    def test_slow_primary_is_routed_around(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                server.model_delays[PRIMARY] = 0.2
+                service = make_chain_service(server.api_base, primary={"max_p95_ms": 100})
+                for _ in range(2):
+                    await service.get_response("hi", [{"role": "user", "content": "hi"}])
+                return [request["model"] for request in server.requests]
+
+        assert asyncio.run(scenario()) == [PRIMARY, BACKUP]
+
+    def test_recovered_primary_is_used_again(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                server.model_delays[PRIMARY] = 0.2
+                service = make_chain_service(server.api_base, primary={"max_p95_ms": 100}, route_probe_after=0.3)
+                for _ in range(2):
+                    await service.get_response("hi", [{"role": "user", "content": "hi"}])
+                server.model_delays[PRIMARY] = 0.0
+                await asyncio.sleep(0.3)
+                for _ in range(5):
+                    await service.get_response("hi", [{"role": "user", "content": "hi"}])
+                return [request["model"] for request in server.requests], service.metrics.counters
+
+        models, counters = asyncio.run(scenario())
+
+        assert models == [PRIMARY, BACKUP] + [PRIMARY] * 5
+        assert counters["llm_route_probes"] == 1
+
+    def test_breaker_past_reset_is_eligible_again(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                service = make_chain_service(server.api_base, circuit_failures=1, circuit_reset=0.2)
+                service._breaker(PRIMARY).record_failure()
+                await service.get_response("hi", [{"role": "user", "content": "hi"}])
+                await asyncio.sleep(0.2)
+                await service.get_response("hi", [{"role": "user", "content": "hi"}])
+                return [request["model"] for request in server.requests]
+
+        assert asyncio.run(scenario()) == [BACKUP, PRIMARY]
+
+    def test_hedge_races_backup_for_first_token(self):
+        async def scenario():
+            async with StubLLMServer(reply="fast answer") as server:
+                server.model_delays[PRIMARY] = 1.0
+                service = make_chain_service(server.api_base, hedge_after_ms=100)
+                started = time.perf_counter()
+                stream = service.stream_response("hi", [{"role": "user", "content": "hi"}])
+                text = "".join([delta async for delta in stream])
+                return text, stream.model, time.perf_counter() - started, service.metrics.counters
+
+        text, model, elapsed, counters = asyncio.run(scenario())
+
+        assert text == "fast answer"
+        assert model == BACKUP
+        assert elapsed < 0.8
+        assert counters["llm_hedges"] == 1
@@ -0,0 +1,205 @@
+import asyncio
+import time
+from pyopenbot.llm_service import LLMService
+from pyopenbot.memory import Memory
+from pyopenbot.tokens import count_message_tokens
+from tests.stub_server import StubLLMServer
+from tests.test_llm_service import make_character
+
+
+class TestMemory:
+    def test_unlimited_keeps_everything(self):
+        memory = Memory(type="unlimited")
+        for i in range(100):
+            memory.add_message("user", f"message {i}")
+
+        assert len(memory.get_messages()) == 100
+
+    def test_sliding_window_keeps_latest_messages(self):
+        memory = Memory(type="sliding_window", max_messages=3)
+        for i in range(10):
+            memory.add_message("user", f"message {i}")
+
+        assert [m["content"] for m in memory.get_messages()] == [
+            "message 7", "message 8", "message 9"
+        ]
+
+    def test_trim_slack_keeps_prefix_stable_between_trims(self):
+        memory = Memory(type="sliding_window", max_messages=10, trim_slack=0.5)
+        firsts = []
+        for i in range(30):
+            memory.add_message("user", f"message {i}")
+            firsts.append(memory.messages[0]["content"])
+
+        assert len(memory.messages) <= 10
+        # The oldest kept message changes once per trim, not on every turn
+        assert len(set(firsts)) <= 5
+
+    def test_token_budget_trim_slack_trims_less_often(self):
+        def prefix_changes(slack: float) -> int:
+            memory = Memory(type="token_budget", max_context=1000, trim_slack=slack)
+            firsts = set()
+            for i in range(200):
+                memory.add_message("user", f"message number {i} " * 5)
+                firsts.add(memory.messages[0]["content"])
+            assert memory.get_context_tokens() <= 1000
+            return len(firsts)
+
+        assert prefix_changes(0.25) * 4 < prefix_changes(0.0)
+
+    def test_token_budget_fits_context_minus_reserve(self):
+        memory = Memory(type="token_budget", max_context=1000, reply_tokens=400)
+        for i in range(200):
+            memory.add_message("user", f"message number {i} " * 5)
+
+        messages = memory.get_messages()
+        used = sum(count_message_tokens(m) for m in messages)
+        assert used <= 600
+        assert used > 600 - count_message_tokens(messages[0])
+        assert messages[-1]["content"].startswith("message number 199")
+
+    def test_capacity_per_type(self):
+        assert Memory(type="unlimited").capacity() == (None, None)
+        assert Memory(type="sliding_window", max_messages=7).capacity() == (7, None)
+        assert Memory(type="token_budget", max_context=1000, system_tokens=100, reply_tokens=400).capacity() == (None, 500)
+
+    def test_token_budget_keeps_oversized_latest_message(self):
+        memory = Memory(type="token_budget", max_context=100, reply_tokens=50)
+        memory.add_message("user", "x" * 1000)
+
+        assert len(memory.get_messages()) == 1
+
+    def test_clear_resets_token_count(self):
+        memory = Memory(type="token_budget", max_context=1000)
+        memory.add_message("user", "hello")
+        memory.clear()
+        memory.add_message("user", "x" * 3996)
+
+        assert len(memory.get_messages()) == 1
+
+    def test_token_budget_trim_cost_at_10k_messages(self):
+        count = 20_000
+        memory = Memory(type="token_budget", max_context=128_000, reply_tokens=8_000)
+
+        started = time.perf_counter()
+        for i in range(count):
+            memory.add_message("user", f"[user{i % 7}]: a typical chat line number {i}")
+        elapsed = time.perf_counter() - started
+
+        print(
+            f"\n{count} messages into token_budget memory: "
+            f"{elapsed * 1000:.1f}ms total, {elapsed / count * 1e6:.2f}us per add, "
+            f"{len(memory.get_messages())} kept"
+        )
+
+        assert len(memory.get_messages()) < count
+        # Cached per-message counts keep each add O(1) amortized
+        assert elapsed / count < 50e-6
+
+    def test_stats_report_current_prompt_size(self):
+        memory = Memory(type="unlimited", max_context=1000, system_tokens=100)
+        memory.add_message("user", "x" * 400)
+        memory.add_message("assistant", "y" * 400)
+        memory.add_usage({"prompt_tokens": 5000, "completion_tokens": 5000})
+
+        stats = memory.get_stats()
+
+        assert stats["context_tokens"] == 100 + 2 * (100 + 4)
+        assert stats["context_usage"] == "308/1000"
+        assert stats["context_percentage"] == 30.8
+        assert stats["total_tokens"] == 10000
+
+    def test_context_tokens_follow_trimming_and_clear(self):
+        memory = Memory(type="sliding_window", max_messages=2)
+        for _ in range(5):
+            memory.add_message("user", "x" * 40)
+
+        assert memory.get_context_tokens() == 2 * (10 + 4)
+
+        memory.clear()
+        assert memory.get_context_tokens() == 0
+
+    def test_summary_folds_old_messages_in_background(self):
+        calls = []
+
+        async def summarizer(previous, messages, on_usage=None):
+            calls.append((previous, [m["content"] for m in messages]))
+            await asyncio.sleep(0.01)
+            return f"summary of {len(messages)} messages", {"prompt_tokens": 7}
+
+        async def scenario():
+            memory = Memory(type="summary", summarize_after=100, keep_recent=2, summarizer=summarizer)
+            for i in range(10):
+                memory.add_message("user", f"message {i} " + "x" * 40)
+            # Folding runs as a task, adding messages never waits for it
+            assert memory.summaries_made == 0
+            await memory._summary_task
+            return memory
+
+        memory = asyncio.run(scenario())
+        messages = memory.get_messages()
+        stats = memory.get_stats()
+
+        assert len(calls) == 1
+        assert calls[0][0] == ""
+        assert messages[0]["role"] == "system"
+        assert "summary of" in messages[0]["content"]
+        assert [m["content"][:9] for m in messages[1:]][-2:] == ["message 8", "message 9"]
+        assert stats["summaries_made"] == 1
+        assert stats["tokens_saved_per_turn"] > 0
+        assert memory.total_prompt_tokens == 7
+
+    def test_summary_discarded_after_clear(self):
+        async def summarizer(previous, messages, on_usage=None):
+            await asyncio.sleep(0.01)
+            return "stale", {}
+
+        async def scenario():
+            memory = Memory(type="summary", summarize_after=10, keep_recent=1, summarizer=summarizer)
+            for i in range(5):
+                memory.add_message("user", "x" * 40)
+            task = memory._summary_task
+            memory.clear()
+            await asyncio.gather(task, return_exceptions=True)
+            return memory
+
+        memory = asyncio.run(scenario())
+
+        assert memory.summary == ""
+        assert memory.get_messages() == []
+
+    def test_llm_service_summarizer_against_stub(self):
+        async def scenario():
+            async with StubLLMServer(reply="they said hello") as server:
+                service = LLMService(make_character(server.api_base))
+                return await service.summarize("", [
+                    {"role": "user", "content": "[alice]: hello"},
+                    {"role": "user", "content": [
+                        {"type": "text", "text": "[bob]: look"},
+                        {"type": "image_url", "image_url": {"url": "data:"}}
+                    ]}
+                ]), server.requests[0]["messages"]
+
+        (summary, usage), sent = asyncio.run(scenario())
+
+        assert summary == "they said hello"
+        assert usage["prompt_tokens"] == 10
+        assert "[bob]: look [image]" in sent[1]["content"]
+
+    def test_summary_cost_is_looked_up_into_memory(self):
+        async def scenario():
+            async with StubLLMServer(reply="a summary") as server:
+                service = LLMService(make_character(server.api_base))
+                service.usage_lookup_delay = 0
+                memory = Memory(type="summary", summarize_after=10, keep_recent=1, summarizer=service.summarize)
+                for i in range(5):
+                    memory.add_message("user", "x" * 40)
+                await memory._summary_task
+                await asyncio.gather(*service._background_tasks)
+                await service.aclose()
+                return memory
+
+        memory = asyncio.run(scenario())
+
+        assert memory.summaries_made == 1
+        assert memory.total_cost > 0
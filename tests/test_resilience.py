@@ -0,0 +1,74 @@
+import time
+import pytest
+from any_llm.exceptions import (
+    ContextLengthExceededError, GatewayTimeoutError, InvalidRequestError, MissingApiKeyError, ProviderError,
+    RateLimitError, UnsupportedParameterError, UnsupportedProviderError, UpstreamProviderError
+)
+from pyopenbot.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable, retry_after_seconds
+)
+
+
+class TestRetryPolicy:
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+        delays = [policy.delay(attempt) for attempt in range(1, 8) for _ in range(20)]
+
+        assert all(0 <= delay <= 4.0 for delay in delays)
+        assert len(set(delays)) > 1
+
+    def test_retry_after_is_honored(self):
+        policy = RetryPolicy(max_retry_after=10)
+
+        assert policy.delay(1, RateLimitError(retry_after="3")) == 3.0
+        assert policy.delay(1, RateLimitError(retry_after="120")) is None
+
+    def test_retry_after_http_date(self):
+        date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+
+        assert 25 < retry_after_seconds(RateLimitError(retry_after=date)) <= 30
+
+    def test_retryable_errors(self):
+        assert is_retryable(TimeoutError())
+        assert is_retryable(RateLimitError())
+        assert is_retryable(ProviderError(status_code=503))
+        assert is_retryable(ProviderError())  # connection error, no HTTP status
+        assert is_retryable(UpstreamProviderError())
+        assert is_retryable(GatewayTimeoutError())
+        assert not is_retryable(InvalidRequestError(status_code=400))
+        assert not is_retryable(ValueError())
+
+    def test_client_errors_without_status_are_not_retried(self):
+        for error in [MissingApiKeyError("openrouter", "OPENROUTER_API_KEY"),
+                      UnsupportedParameterError("seed", "openrouter"),
+                      UnsupportedProviderError("nope", ["openrouter"]),
+                      ContextLengthExceededError(), InvalidRequestError()]:
+            assert not is_retryable(error), type(error).__name__
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_recovers(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_after=0.05)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        breaker.before_call()  # the trial call
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()  # only one trial at a time
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_after=0.01)
+        breaker.before_call()
+        breaker.record_failure()
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record_failure()
+
+        assert breaker.state == "open"
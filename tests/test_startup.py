@@ -0,0 +1,40 @@
+import subprocess
+import sys
+from pathlib import Path
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# Only commands that run a bot may pull these in
+HEAVY_MODULES = ("any_llm", "openai", "anthropic", "discord", "aiohttp", "PIL")
+
+# Cumulative import time of the CLI, microseconds; it takes ~0.2s without the LLM SDK and ~2.7s with it
+IMPORT_BUDGET_US = 800_000
+
+
+def import_times(*args: str) -> dict:
+    """Run the CLI under -X importtime and return cumulative microseconds per imported module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "pyopenbot", *args],
+        capture_output=True, text=True, timeout=60
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+    def check_budget(self, times: dict):
+        heavy = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+        assert heavy == []
+        assert times["pyopenbot.cli.CLI"] < IMPORT_BUDGET_US
+
+    def test_help_skips_heavy_imports(self):
+        self.check_budget(import_times("--help"))
+
+    def test_check_skips_heavy_imports(self):
+        self.check_budget(import_times("check", str(FIXTURES / "valid_config.yaml")))
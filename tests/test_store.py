@@ -0,0 +1,70 @@
+import tempfile
+import time
+from pathlib import Path
+from pyopenbot.memory import Memory
+from pyopenbot.store import ConversationStore
+
+
+class TestConversationStore:
+    def test_memory_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bot" / "123.jsonl"
+
+            memory = Memory(type="unlimited")
+            memory.attach_store(ConversationStore(path), tail=100)
+            memory.add_message("user", "[alice]: hi")
+            memory.add_message("assistant", "[bot]: hello")
+            memory.add_usage({"cost": 0.5, "prompt_tokens": 10, "completion_tokens": 3})
+            memory.close()
+
+            restored = Memory(type="unlimited")
+            restored.attach_store(ConversationStore(path), tail=100)
+
+            assert restored.get_messages() == [
+                {"role": "user", "content": "[alice]: hi"},
+                {"role": "assistant", "content": "[bot]: hello"},
+            ]
+            assert restored.total_cost == 0.5
+            assert restored.total_prompt_tokens == 10
+            assert restored.total_completion_tokens == 3
+            restored.close()
+
+    def test_tail_stops_at_clear(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ConversationStore(Path(tmp) / "log.jsonl")
+            store.append_message({"role": "user", "content": "before"})
+            store.append_clear()
+            store.append_message({"role": "user", "content": "after"})
+            store.close()
+
+            assert ConversationStore(Path(tmp) / "log.jsonl").load_tail(10) == [
+                {"role": "user", "content": "after"}
+            ]
+
+    def test_tail_spans_read_blocks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ConversationStore(Path(tmp) / "log.jsonl")
+            store.BLOCK_SIZE = 64
+            for i in range(50):
+                store.append_message({"role": "user", "content": f"message {i} é"})
+            store.close()
+
+            tail = store.load_tail(20)
+
+            assert [m["content"] for m in tail] == [f"message {i} é" for i in range(30, 50)]
+
+    def test_loading_tail_does_not_scale_with_log_size(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ConversationStore(Path(tmp) / "log.jsonl", flush_every=10_000)
+            for i in range(200_000):
+                store.append_message({"role": "user", "content": f"[user]: chat line {i}"})
+            store.close()
+
+            started = time.perf_counter()
+            tail = ConversationStore(Path(tmp) / "log.jsonl").load_tail(200)
+            elapsed = time.perf_counter() - started
+
+            print(f"\nloaded 200-message tail of a 200k-line log in {elapsed * 1000:.2f}ms")
+            assert tail[-1]["content"] == "[user]: chat line 199999"
+            assert len(tail) == 200
+            assert elapsed < 0.05
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+import yaml
+from pathlib import Path
+from pyopenbot.supervisor import Supervisor, UsageLedger
+from tests.stub_discord import StubDiscordServer
+from tests.stub_server import StubLLMServer
+
+
+class ServerThread:
+    """Runs stub servers on their own loop, so the synchronous supervisor can be driven from the test"""
+
+    def __init__(self, *servers):
+        self.servers = servers
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        for server in self.servers:
+            self.call(server.start())
+        return self
+
+    def __exit__(self, *exc):
+        for server in self.servers:
+            self.call(server.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout=30)
+
+
+def write_config(path: Path, name: str, llm: StubLLMServer, discord_server: StubDiscordServer) -> Path:
+    path.write_text(yaml.safe_dump({
+        "character_name": name,
+        "character_card": "You are a test bot.",
+        "platform": "discord",
+        "llm": {
+            "provider": "openrouter",
+            "model": "z-ai/glm-4.5",
+            "api_key": "test-key",
+            "settings": {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "max_tokens": 100,
+                "context_window": 8192,
+                "api_base": llm.api_base,
+            },
+        },
+        "memory": {"type": "unlimited"},
+        "discord": {"token": f"token-{name}", "channel_id": "*", **discord_server.settings},
+    }))
+    return path
+
+
+def wait_until(condition, supervisor: Supervisor, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        supervisor.poll(0.1)
+
+
+class TestUsageLedger:
+    def test_sums_per_character_and_survives_reload(self, tmp_path):
+        ledger = UsageLedger(tmp_path / "ledger.json")
+        ledger.add("a", {"cost": 0.5, "prompt_tokens": 10})
+        ledger.add("a", {"cost": 0.25, "completion_tokens": 3})
+        ledger.add("b", {"prompt_tokens": 1})
+        ledger.save()
+
+        reloaded = UsageLedger(tmp_path / "ledger.json")
+        assert reloaded.totals["a"]["cost"] == 0.75
+        assert reloaded.totals["a"]["completion_tokens"] == 3
+        assert reloaded.totals["b"]["prompt_tokens"] == 1
+
+
+class TestSupervisor:
+    def test_restarts_crashed_workers_and_drains_on_stop(self, tmp_path):
+        llm = StubLLMServer(reply="pong", delay=1.5, inline_cost=0.01)
+        discord_server = StubDiscordServer()
+        with ServerThread(llm, discord_server) as servers:
+            configs = [write_config(tmp_path / f"{name}.yaml", name, llm, discord_server) for name in ("ann", "bob")]
+            supervisor = Supervisor(
+                configs, workers=2, ledger_path=tmp_path / "ledger.json",
+                drain_timeout=10, restart_delay=0.2
+            )
+            supervisor.start()
+            try:
+                wait_until(lambda: discord_server.identifies == 2, supervisor)
+
+                crashed = supervisor.processes[0]
+                os.kill(crashed.pid, signal.SIGKILL)
+                wait_until(lambda: discord_server.identifies == 3, supervisor)
+                assert supervisor.processes[0] is not crashed
+
+                # Both bots see the message; stop while their replies are still generating
+                servers.call(discord_server.dispatch_message(5, "ping"))
+                wait_until(lambda: len(llm.requests) == 2, supervisor)
+            finally:
+                supervisor.stop()
+
+        assert sorted(discord_server.sent) == [("5", "pong"), ("5", "pong")]
+        assert [process.exitcode for process in supervisor.processes] == [0, 0]
+        totals = UsageLedger(tmp_path / "ledger.json").totals
+        assert totals["ann"]["cost"] == totals["bob"]["cost"] == 0.01
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import List
+from pyopenbot.llm_service import LLMService
+from pyopenbot.memory import Memory
+from pyopenbot.platforms.terminal_platform import TerminalPlatform
+from tests.stub_server import StubLLMServer
+from tests.test_llm_service import make_character
+
+
+def make_platform(api_base: str, lines: List, **settings) -> TerminalPlatform:
+    """Platform whose input comes from lines; a callable line is awaited and returns the text"""
+    async def read_line() -> str:
+        if not lines:
+            return ""
+        line = lines.pop(0)
+        return await line() if callable(line) else line
+
+    character = make_character(api_base, **settings)
+    return TerminalPlatform(character, LLMService(character), Memory(type="unlimited"), read_line)
+
+
+class TestTerminalPlatform:
+    def test_conversation_until_end_of_input(self):
+        async def scenario():
+            async with StubLLMServer(reply="Hi there", inline_cost=0.001) as server:
+                platform = make_platform(server.api_base, ["hello\n", "/stats\n", "again\n"])
+                await platform.start()
+                return platform.memory
+
+        memory = asyncio.run(scenario())
+
+        assert [m["content"] for m in memory.messages] == ["hello", "Hi there", "again", "Hi there"]
+        assert memory.total_cost == 0.002
+
+    def test_system_prompt_is_sent_first(self):
+        async def scenario():
+            async with StubLLMServer(reply="Hi there") as server:
+                platform = make_platform(server.api_base, ["hello\n", "again\n"])
+                await platform.start()
+                return server.requests
+
+        requests = asyncio.run(scenario())
+
+        assert [m["role"] for m in requests[1]["messages"]] == ["system", "user", "assistant", "user"]
+        assert requests[1]["messages"][0]["content"] == "You are a test bot."
+
+    def test_quit_ends_the_session(self):
+        async def scenario():
+            async with StubLLMServer() as server:
+                platform = make_platform(server.api_base, ["/quit\n", "never read\n"])
+                await platform.start()
+                return platform.memory, server.requests
+
+        memory, requests = asyncio.run(scenario())
+
+        assert memory.messages == []
+        assert requests == []
+
+    def test_interrupt_cancels_the_reply_in_flight(self):
+        async def scenario():
+            async with StubLLMServer(delay=3) as server:
+                async def interrupt_once_sent():
+                    while not server.requests:
+                        await asyncio.sleep(0.01)
+                    platform._interrupt()
+
+                platform = make_platform(server.api_base, ["hello\n"], stream=True)
+                watcher = asyncio.create_task(interrupt_once_sent())
+                started = time.perf_counter()
+                await platform.start()
+                await watcher
+                return platform.memory, time.perf_counter() - started
+
+        memory, elapsed = asyncio.run(scenario())
+
+        assert elapsed < 2
+        assert [m["role"] for m in memory.messages] == ["user"]
+
+    def test_usage_lookup_lands_while_waiting_for_input(self):
+        async def scenario():
+            async with StubLLMServer(reply="Hi there") as server:
+                async def after_a_pause() -> str:
+                    await asyncio.sleep(0.3)
+                    costs.append(platform.memory.total_cost)
+                    return ""
+
+                costs = []
+                platform = make_platform(server.api_base, ["hello\n", after_a_pause])
+                platform.llm_service.usage_lookup_delay = 0
+                await platform.start()
+                return costs
+
+        costs = asyncio.run(scenario())
+
+        assert costs[0] > 0